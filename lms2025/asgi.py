@@ -0,0 +1,15 @@
+"""
+ASGI config for lms2025 project.
+
+Serve with an ASGI server (e.g. uvicorn lms2025.asgi:application, or gunicorn
+with -k uvicorn.workers.UvicornWorker) and set LIVE_EVENTS=True to turn on the
+live standings feed; its long-lived connections then stay off the worker threads.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms2025.settings')
+
+application = get_asgi_application()
@@ -6,7 +6,11 @@ from django.shortcuts import redirect
 from django.urls import path
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Team, Week, Pool, Entry, Pick, AuditLog, PoolWeekSettings, WeeklyResult
+from django.db.models import Count
+from .models import Team, Week, Pool, Entry, Pick, AuditLog, PoolWeekSettings, WeeklyResult, ResultsFile
+from .pages import warm_pool_pages
+from .simulator import WeekSimulator
+from .results import RESULT_LABELS, parse_scores, preview_week_results, recompute_results, record_week_results, results_from_scores, settle_pools
 
 
 @admin.register(Team)
@@ -40,8 +44,10 @@ class WeekAdmin(admin.ModelAdmin):
     
     def process_results_link(self, obj):
         return format_html(
-            '<a href="{}" class="button">Set Results</a>',
-            f'/admin/pool/week/{obj.id}/process-results/'
+            '<a href="{}" class="button" style="margin-right: 5px;">Set Results</a>'
+            '<a href="{}" class="button">What If</a>',
+            f'/admin/pool/week/{obj.id}/process-results/',
+            f'/admin/pool/week/{obj.id}/simulate/'
         )
     process_results_link.short_description = 'Game Results'
     
@@ -49,13 +55,14 @@ class WeekAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('<path:object_id>/process-results/', self.admin_site.admin_view(self.process_results_view), name='pool_week_process_results'),
+            path('<path:object_id>/simulate/', self.admin_site.admin_view(self.simulate_results_view), name='pool_week_simulate'),
         ]
         return custom_urls + urls
     
     def process_results_view(self, request, object_id):
         week_id = object_id
         week = Week.objects.get(id=week_id)
-        teams = Team.objects.all().order_by('conference', 'division', 'city')
+        teams = list(Team.objects.all().order_by('conference', 'division', 'city'))
         
         # Process form submission
         if request.method == 'POST':
@@ -63,44 +70,97 @@ class WeekAdmin(admin.ModelAdmin):
             
             # Handle reset action
             if action == 'reset':
-                # Delete all WeeklyResult objects for this week
+                # Delete all WeeklyResult objects for this week, then put the picks and entries back in line
                 deleted_count, _ = WeeklyResult.objects.filter(week=week).delete()
+                changes = recompute_results(week, user=request.user)
                 messages.success(request, f'Successfully reset all results for Week {week.number}. Removed {deleted_count} result records.')
+                self._recompute_message(request, changes)
                 return redirect('admin:pool_week_process_results', object_id=week_id)
             
-            # Handle save action (default)
-            # Get selected teams and their results
-            processed_teams = 0
+            if action == 'recompute':
+                # Rebuild picks and entry statuses from the recorded results, this week to the end of the season
+                changes = recompute_results(week, user=request.user)
+                messages.success(request, f'Recomputed results from Week {week.number} on.')
+                self._recompute_message(request, changes)
+                return redirect('admin:pool_week_process_results', object_id=week_id)
             
-            for team in teams:
-                result_key = f'result_{team.id}'
-                if result_key in request.POST and request.POST[result_key]:
-                    result = request.POST[result_key]
-                    notes = request.POST.get(f'notes_{team.id}', '')
-                    
-                    # Save or update the result
-                    weekly_result, created = WeeklyResult.objects.update_or_create(
-                        week=week,
-                        team=team,
-                        defaults={'result': result, 'notes': notes}
-                    )
-                    
-                    processed_teams += 1
+            if action in ('preview', 'import'):
+                # Results derived from an uploaded file of final scores
+                upload = request.FILES.get('scores_file')
+                if upload is None:
+                    messages.error(request, 'Choose a CSV or JSON file of final scores to upload.')
+                    return redirect('admin:pool_week_process_results', object_id=week_id)
+                try:
+                    submitted = results_from_scores(parse_scores(upload.read().decode('utf-8'), upload.name))
+                except (UnicodeDecodeError, ValueError) as e:
+                    messages.error(request, f'Could not import {upload.name}: {e}')
+                    return redirect('admin:pool_week_process_results', object_id=week_id)
+                
+                if action == 'preview':
+                    # Show the form filled in from the file, with who it would eliminate
+                    preview = preview_week_results(week, submitted)
+                    results = {
+                        result.team_id: (result.result, result.notes)
+                        for result in WeeklyResult.objects.filter(week=week)
+                    }
+                    results.update(submitted)
+                    return self._process_results_response(request, week, teams, results, preview)
+            else:
+                # Handle save action (default)
+                # Get selected teams and their results
+                submitted = {}
+                for team in teams:
+                    result = request.POST.get(f'result_{team.id}')
+                    if result in RESULT_LABELS:
+                        submitted[team.id] = (result, request.POST.get(f'notes_{team.id}', ''))
             
-            messages.success(request, f'Successfully processed results for {processed_teams} teams in Week {week.number}')
+            # One transaction and one elimination pass for the whole week
+            eliminated = record_week_results(week, submitted)
+            
+            # Results reveal eliminations, so rebuild the pool pages before players reload them
+            warm_pool_pages(week)
+            
+            message = f'Successfully processed results for {len(submitted)} teams in Week {week.number}'
+            if eliminated:
+                teams_by_id = {team.id: team for team in teams}
+                message += '. Eliminated: ' + ', '.join(
+                    f'{teams_by_id[team_id]} ({len(entries)})' for team_id, entries in eliminated.items()
+                )
+            messages.success(request, message)
             return redirect('admin:pool_week_changelist')
         
+        # Existing results for every team in one query
+        results = {
+            result.team_id: (result.result, result.notes)
+            for result in WeeklyResult.objects.filter(week=week)
+        }
+        return self._process_results_response(request, week, teams, results)
+    
+    def _recompute_message(self, request, changes):
+        """Report what recompute_results changed"""
+        messages.info(
+            request,
+            f"{changes['picks']} pick results updated; {len(changes['eliminated'])} entries eliminated, "
+            f"{len(changes['revived'])} revived, {len(changes['moved'])} moved to a different elimination week."
+        )
+    
+    def _process_results_response(self, request, week, teams, results, preview=None):
+        """
+        Render the results form with results ({team id: (result, notes)}) filled in.
+        preview is the {team id: entries} an uploaded file would eliminate.
+        """
+        pick_counts = dict(
+            Pick.objects.filter(week=week)
+            .values('team_id')
+            .annotate(count=Count('id'))
+            .values_list('team_id', 'count')
+        )
+        
         # Prepare team data for the template
         team_data = []
         for team in teams:
-            # Get existing result for this team if any
-            result_obj = WeeklyResult.objects.filter(week=week, team=team).first()
-            result = result_obj.result if result_obj else ''
-            notes = result_obj.notes if result_obj else ''
-            
-            # Get pick count for this team
-            pick_count = Pick.objects.filter(week=week, team=team).count()
-            
+            result, notes = results.get(team.id, ('', ''))
+            pick_count = pick_counts.get(team.id, 0)
             team_data.append({
                 'team': team,
                 'result': result,
@@ -122,9 +182,88 @@ class WeekAdmin(admin.ModelAdmin):
             'has_permission': True,
         }
         
+        if preview is not None:
+            teams_by_id = {team.id: team for team in teams}
+            context['preview'] = [
+                {'team': teams_by_id[team_id], 'entries': entries}
+                for team_id, entries in preview.items()
+            ]
+            context['preview_total'] = sum(len(entries) for entries in preview.values())
+        
         return TemplateResponse(request, 'admin/pool/process_results.html', context)
 
 
+    def simulate_results_view(self, request, object_id):
+        """
+        What-if panel: survivors per pool for the results chosen in the form,
+        for each undecided team losing, and across every combination of the
+        undecided results. Nothing is saved.
+        """
+        week = Week.objects.get(id=object_id)
+        simulator = WeekSimulator.for_week(week)
+        teams = Team.objects.in_bulk(simulator.pending_teams + list(simulator.known_results))
+        pools = Pool.objects.in_bulk(simulator.pool_ids)
+        
+        # Hypothetical results come in as GET parameters, so a scenario can be bookmarked
+        scenario = {}
+        for team_id in simulator.pending_teams:
+            result = request.GET.get(f'result_{team_id}')
+            if result in RESULT_LABELS:
+                scenario[team_id] = result
+        
+        current = simulator.evaluate()
+        simulated = simulator.evaluate(scenario)
+        pool_rows = [
+            {
+                'pool': pools[pool_id],
+                'entries': simulator.entries_by_pool[pool_id],
+                'current': current[pool_id],
+                'simulated': simulated[pool_id],
+            }
+            for pool_id in simulator.pool_ids
+        ]
+        
+        team_rows = [
+            {
+                'team': teams[team_id],
+                'result': scenario.get(team_id, ''),
+                'if_loses': [survivors[pool_id] for pool_id in simulator.pool_ids],
+            }
+            for team_id, survivors in simulator.if_loses().items()
+        ]
+        team_rows.sort(key=lambda row: str(row['team']))
+        
+        enumeration = None
+        enumeration_error = None
+        try:
+            summary = simulator.enumerate()
+        except ValueError as e:
+            enumeration_error = str(e)
+        else:
+            enumeration = {
+                'outcomes': summary['outcomes'],
+                'pools': [dict(summary[pool_id], pool=pools[pool_id]) for pool_id in simulator.pool_ids],
+            }
+        
+        context = {
+            'title': f'What If: Week {week.number}',
+            'opts': self.model._meta,
+            'week': week,
+            'pool_rows': pool_rows,
+            'pools': [pools[pool_id] for pool_id in simulator.pool_ids],
+            'team_rows': team_rows,
+            'known_results': sorted(
+                ((teams[team_id], result) for team_id, result in simulator.known_results.items()),
+                key=lambda item: str(item[0])
+            ),
+            'enumeration': enumeration,
+            'enumeration_error': enumeration_error,
+            'has_permission': True,
+        }
+        
+        return TemplateResponse(request, 'admin/pool/simulate_results.html', context)
+
+
 class PoolWeekSettingsInline(admin.TabularInline):
     model = PoolWeekSettings
     extra = 0
@@ -253,6 +392,7 @@ class EntryAdmin(admin.ModelAdmin):
         formset.save_m2m()
         
         # Process audit logging and entry status updates for changed picks
+        settle_weeks = {}
         for instance in instances:
             if hasattr(instance, '_original_team') and hasattr(instance, '_original_result'):
                 changes = []
@@ -275,86 +415,13 @@ class EntryAdmin(admin.ModelAdmin):
                         details=f"Administrator {request.user.username} updated pick {changes_text}."
                     )
                     
-                    # If result changed from win to loss or vice versa, we might need to update entry status
-                    if instance._original_result != instance.result and \
-                       (instance._original_result == 'win' or instance.result == 'win') and \
-                       (instance._original_result == 'loss' or instance.result == 'loss'):
-                        # Get pool settings
-                        pool_settings = PoolWeekSettings.objects.filter(
-                            pool=instance.entry.pool, 
-                            week=instance.week
-                        ).first()
-                        is_double_pick = pool_settings and pool_settings.is_double
-                        
-                        if is_double_pick:
-                            # For double-pick weeks, we need to check all picks for this entry
-                            all_picks = Pick.objects.filter(entry=instance.entry, week=instance.week)
-                            
-                            # Count how many are wins
-                            win_count = all_picks.filter(result='win').count()
-                            loss_count = all_picks.filter(result__in=['loss', 'tie']).count()
-                            
-                            # If two picks and both are losses, eliminate
-                            if all_picks.count() == 2 and loss_count == 2 and instance.entry.is_alive:
-                                instance.entry.is_alive = False
-                                instance.entry.eliminated_in_week = instance.week
-                                instance.entry.save(update_fields=['is_alive', 'eliminated_in_week'])
-                                
-                                AuditLog.create(
-                                    user=request.user,
-                                    action="ADMIN_PICK_CHANGE_ELIMINATED",
-                                    entry=instance.entry,
-                                    week=instance.week,
-                                    details=f"Entry was eliminated due to admin changing pick result to loss/tie."
-                                )
-                            # If was eliminated but now has at least one win, potentially revive
-                            elif win_count > 0 and not instance.entry.is_alive and instance.entry.eliminated_in_week == instance.week:
-                                # Check if any entry has 2 wins for this week
-                                entries_with_two_wins = Entry.objects.filter(
-                                    pool=instance.entry.pool,
-                                    picks__week=instance.week,
-                                    picks__result='win'
-                                ).annotate(win_count=models.Count('picks')).filter(win_count=2)
-                                
-                                # If no entries with two wins, or this entry has two wins, revive it
-                                if not entries_with_two_wins.exists() or (win_count == 2):
-                                    instance.entry.is_alive = True
-                                    instance.entry.eliminated_in_week = None
-                                    instance.entry.save(update_fields=['is_alive', 'eliminated_in_week'])
-                                    
-                                    AuditLog.create(
-                                        user=request.user,
-                                        action="ADMIN_PICK_CHANGE_REVIVED",
-                                        entry=instance.entry,
-                                        week=instance.week,
-                                        details=f"Entry was revived due to admin changing pick result to win."
-                                    )
-                        else:
-                            # For regular weeks, it's simpler
-                            if instance.result in ['loss', 'tie'] and instance.entry.is_alive:
-                                instance.entry.is_alive = False
-                                instance.entry.eliminated_in_week = instance.week
-                                instance.entry.save(update_fields=['is_alive', 'eliminated_in_week'])
-                                
-                                AuditLog.create(
-                                    user=request.user,
-                                    action="ADMIN_PICK_CHANGE_ELIMINATED",
-                                    entry=instance.entry,
-                                    week=instance.week,
-                                    details=f"Entry was eliminated due to admin changing pick result to {instance.result}."
-                                )
-                            elif instance.result == 'win' and not instance.entry.is_alive and instance.entry.eliminated_in_week == instance.week:
-                                instance.entry.is_alive = True
-                                instance.entry.eliminated_in_week = None
-                                instance.entry.save(update_fields=['is_alive', 'eliminated_in_week'])
-                                
-                                AuditLog.create(
-                                    user=request.user,
-                                    action="ADMIN_PICK_CHANGE_REVIVED",
-                                    entry=instance.entry,
-                                    week=instance.week,
-                                    details=f"Entry was revived due to admin changing pick result to win."
-                                )
+                    # A changed result can eliminate or revive entries; settle each week once below
+                    if instance._original_result != instance.result:
+                        settle_weeks.setdefault(instance.week, set()).add(instance.entry.pool_id)
+        
+        for week, pool_ids in settle_weeks.items():
+            settle_pools(week, pool_ids, user=request.user)
+    
     inlines = [PickInline]
     actions = ['mark_as_alive', 'mark_as_eliminated']
     
@@ -703,6 +770,26 @@ class WeeklyResultAdmin(admin.ModelAdmin):
         return format_html('<a href="{}?team__id__exact={}&week__id__exact={}">{} picks</a>', 
                           '/admin/pool/pick/', obj.team.id, obj.week.id, count)
     pick_count.short_description = 'Picks'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        warm_pool_pages(obj.week)
+
+
+@admin.register(ResultsFile)
+class ResultsFileAdmin(admin.ModelAdmin):
+    list_display = ('processed_at', 'name', 'week', 'games', 'eliminated', 'error')
+    list_filter = ('week',)
+    search_fields = ('name', 'checksum', 'error')
+    readonly_fields = ('processed_at', 'name', 'checksum', 'week', 'games', 'eliminated', 'error')
+    
+    def has_add_permission(self, request):
+        """Files are recorded by the watch_results command"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Prevent editing of the ledger (delete a row to let its file be applied again)"""
+        return False
 
 
 # We'll enhance the PickInline class instead of creating a separate PickAdmin
@@ -8,3 +8,7 @@ class PoolConfig(AppConfig):
     def ready(self):
         # Import signals when app is ready
         import pool.signals
+        # Register the SQLite connection tuning hook
+        import pool.db
+        # Register the shared-cache system check
+        import pool.checks
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+# Cache backends whose entries live inside one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """Whether every process (web workers and management commands) sees the same default cache"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register()
+def check_live_events_cache(app_configs, **kwargs):
+    """The live feed is carried by the cache, so it needs one every process shares"""
+    if not settings.LIVE_EVENTS or cache_is_shared():
+        return []
+    return [
+        Warning(
+            "LIVE_EVENTS is on but the default cache is local to each process.",
+            hint=(
+                "Eliminations recorded by management commands or another worker won't reach "
+                "this worker's live feed. Set CACHE_BACKEND to a shared cache such as Redis "
+                "or Memcached."
+            ),
+            id='pool.W001',
+        )
+    ]
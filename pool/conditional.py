@@ -0,0 +1,51 @@
+import hashlib
+
+from django.utils import timezone
+
+from .models import Week
+from .pages import pool_pages_version, pool_versions
+from .timeline import entry_timeline_version
+
+
+# ETag functions for django.views.decorators.http.condition. Each one builds
+# the token from the database version counters behind the page caches (see
+# pool.models.CacheVersion), so a change made by any process shows up, plus
+# the current week, for a few indexed queries on small tables. The viewer is
+# part of every token because the pages show their own entries and picks.
+
+
+def _etag(*parts):
+    return hashlib.md5(":".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def standings_etag(request, pool_id, tab=None):
+    week = Week.get_current()
+    past_deadline = week.is_past_deadline() if week else False
+    pages_version, picks_version = pool_versions(pool_id)
+    # Before the deadline the page shows the viewer's own picks, which only the picks version tracks
+    if past_deadline:
+        picks_version = 0
+    # The full page runs the missed-pick eliminations, so a 304 is only safe for the same
+    # set of weeks they cover; within it, anything they eliminate bumps the pages version
+    missed_pick_weeks = [missed.id for missed in Week.missed_pick_weeks()]
+    return _etag(
+        'standings', pool_id, pages_version, picks_version,
+        week.id if week else 0, int(past_deadline), missed_pick_weeks, request.user.id
+    )
+
+
+def week_picks_etag(request, pool_id, week_number):
+    week = Week.objects.filter(number=week_number).first()
+    if week is None or not week.is_past_deadline():
+        # The view 404s or redirects - nothing worth revalidating
+        return None
+    return _etag('week-picks', pool_id, pool_pages_version(pool_id), week.id, request.user.id)
+
+
+def entry_detail_etag(request, entry_id):
+    week = Week.get_current()
+    past_deadline = week.is_past_deadline() if week else False
+    return _etag(
+        'entry', entry_id, entry_timeline_version(entry_id),
+        week.id if week else 0, int(past_deadline), request.user.id
+    )
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Exists, OuterRef
+
+from .models import CacheVersion, Pool, PoolWeekSettings
+
+
+def home_dashboard_key(user_id):
+    return f"home-dashboard:{user_id}"
+
+
+def _version_key(user_id):
+    return f"home-dashboard-version:{user_id}"
+
+
+def get_home_dashboard(user, week):
+    """
+    Per-pool summary of the user's entries for the home page: entries alive,
+    entries still needing a pick for the week, and whether it's a double-pick week.
+
+    Built with one annotated query and cached per user until their picks or
+    entries change (see invalidate_home_dashboard) or the week rolls over.
+    """
+    week_id = week.id if week else None
+    version = CacheVersion.current(_version_key(user.id))[0]
+    cached = cache.get(home_dashboard_key(user.id))
+    if cached is not None and cached['week_id'] == week_id and cached['version'] == version:
+        return cached['pools']
+
+    pools = build_home_dashboard(user, week)
+    cache.set(
+        home_dashboard_key(user.id),
+        {'week_id': week_id, 'version': version, 'pools': pools},
+        settings.HOME_DASHBOARD_CACHE_TIMEOUT
+    )
+    return pools
+
+
+def build_home_dashboard(user, week):
+    """Run the dashboard query: one row per pool the user has entries in"""
+    # Filtering on entries__user first means the counts below only see the user's entries
+    pools = Pool.objects.filter(entries__user=user).annotate(
+        my_entries=Count('entries', distinct=True),
+        my_alive=Count('entries', filter=Q(entries__is_alive=True), distinct=True),
+    )
+    if week:
+        pools = pools.annotate(
+            my_picked=Count(
+                'entries',
+                filter=Q(entries__is_alive=True, entries__picks__week=week),
+                distinct=True
+            ),
+            is_double=Exists(
+                PoolWeekSettings.objects.filter(pool=OuterRef('pk'), week=week, is_double=True)
+            ),
+        )
+
+    dashboard = []
+    for pool in pools.order_by('name'):
+        picked = getattr(pool, 'my_picked', 0)
+        dashboard.append({
+            'id': pool.id,
+            'name': pool.name,
+            'description': pool.description,
+            'year': pool.year,
+            'entries': pool.my_entries,
+            'alive': pool.my_alive,
+            'needs_pick': pool.my_alive - picked if week else 0,
+            'is_double': getattr(pool, 'is_double', False),
+        })
+    return dashboard
+
+
+def invalidate_home_dashboard(*user_ids):
+    """Retire the cached dashboards for these users, in every process, by bumping their version"""
+    CacheVersion.bump([_version_key(user_id) for user_id in user_ids])
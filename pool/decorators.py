@@ -0,0 +1,49 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+# Async counterparts of login_required, condition() and cache_control, which
+# only wrap sync views in Django 4.2.
+
+
+def async_login_required(view_func):
+    """Redirect anonymous users to the login page, like login_required"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def async_revalidate(etag_func):
+    """
+    Answer GET/HEAD with 304 when the ETag from etag_func still matches, without
+    running the view, and mark responses private, no-cache so browsers always
+    revalidate. Same contract as condition(etag_func=...) plus
+    cache_control(private=True, no_cache=True).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                etag = quote_etag(etag) if etag else None
+                response = get_conditional_response(request, etag=etag)
+                if response is not None:
+                    patch_cache_control(response, private=True, no_cache=True)
+                    return response
+
+            response = await view_func(request, *args, **kwargs)
+            if etag and request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', etag)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,14 +1,142 @@
+from functools import lru_cache
+
 from django import forms
 from django.core.exceptions import ValidationError
+from django.forms.utils import flatatt
 from django.utils import timezone
+from django.utils.html import format_html, format_html_join
 
 from .models import Pick, Entry, Team
+from .picks import new_submission_key, save_entry_picks, apply_pick_assignments, load_entry_pick_state
+
+
+class SubmissionKeyField(forms.CharField):
+    """
+    Hidden field carrying the form's idempotency key, so a double-clicked or
+    retried submission is only applied once and a stale one can't undo a newer
+    change (see pool.picks.save_entry_picks).
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('widget', forms.HiddenInput)
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('initial', new_submission_key)
+        super().__init__(**kwargs)
+
+
+# Distinct option lists kept per process. Early in the season most entries have
+# used the same teams, so even a big quick-pick page needs only a few of them.
+TEAM_OPTIONS_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=TEAM_OPTIONS_CACHE_SIZE)
+def available_team_choices(team_choices, week_id, used_team_ids, current_team_ids):
+    """
+    The (id, label) choices an entry can pick from, memoized by
+    (team list, week, used-team signature, existing pick).
+    Teams in current_team_ids stay available even if they count as used.
+    """
+    return tuple(
+        (team_id, label) for team_id, label in team_choices
+        if team_id not in used_team_ids or team_id in current_team_ids
+    )
+
+
+@lru_cache(maxsize=TEAM_OPTIONS_CACHE_SIZE)
+def render_team_options(choices, selected):
+    """The <option> markup for a choice list with one selected value, memoized"""
+    return format_html_join(
+        '',
+        '<option value="{}"{}>{}</option>',
+        ((team_id, ' selected' if str(team_id) == selected else '', label) for team_id, label in choices)
+    )
+
+
+class TeamSelect(forms.Select):
+    """
+    Select widget that renders its options from render_team_options instead of
+    one template per option.
+    """
+    def __init__(self, attrs=None, empty_label="---------"):
+        self.empty_label = empty_label
+        super().__init__(attrs)
+    
+    def use_required_attribute(self, initial):
+        # The empty option is rendered here rather than being part of the choices
+        return not self.is_hidden
+    
+    def render(self, name, value, attrs=None, renderer=None):
+        selected = '' if value is None else str(value)
+        return format_html(
+            '<select name="{}"{}><option value="">{}</option>{}</select>',
+            name,
+            flatatt(self.build_attrs(self.attrs, attrs)),
+            self.empty_label,
+            render_team_options(tuple(self.choices), selected)
+        )
+
+
+class TeamChoiceField(forms.ChoiceField):
+    """
+    Team dropdown built from an in-memory list of Team objects instead of a queryset,
+    so rendering and validating it doesn't hit the database. Cleans to the Team.
+    """
+    widget = TeamSelect
+    
+    def __init__(self, teams_by_id, choices, **kwargs):
+        self.teams_by_id = teams_by_id
+        if 'widget' not in kwargs:
+            kwargs['widget'] = TeamSelect(attrs={'class': 'form-select'})
+        super().__init__(choices=choices, **kwargs)
+    
+    @property
+    def teams(self):
+        """The available Team objects, in dropdown order"""
+        return [self.teams_by_id[str(team_id)] for team_id, label in self.choices]
+    
+    def prepare_value(self, value):
+        # Accept a Team as initial data, like ModelChoiceField does
+        return getattr(value, 'pk', value)
+    
+    def clean(self, value):
+        value = super().clean(value)
+        return self.teams_by_id.get(str(value)) if value else None
+
+
+class TeamOptions:
+    """
+    The team list for one form (a single query), handing out TeamChoiceFields
+    whose choices come from the memoized available_team_choices.
+    """
+    def __init__(self):
+        teams = list(Team.objects.all())
+        self.teams_by_id = {str(team.pk): team for team in teams}
+        self.choices = tuple((team.pk, str(team)) for team in teams)
+    
+    def choices_for(self, week=None, used_team_ids=(), current_team_ids=()):
+        return available_team_choices(
+            self.choices,
+            week.id if week else None,
+            frozenset(used_team_ids),
+            frozenset(current_team_ids)
+        )
+    
+    def teams_for(self, week=None, used_team_ids=(), current_team_ids=()):
+        """The available Team objects, in dropdown order"""
+        choices = self.choices_for(week, used_team_ids, current_team_ids)
+        return [self.teams_by_id[str(team_id)] for team_id, label in choices]
+    
+    def field(self, week=None, used_team_ids=(), current_team_ids=(), **kwargs):
+        choices = self.choices_for(week, used_team_ids, current_team_ids)
+        return TeamChoiceField(self.teams_by_id, choices, **kwargs)
 
 
 class PickForm(forms.ModelForm):
     """
     Form for submitting a pick for a specific entry and week.
     """
+    submission_key = SubmissionKeyField()
+    
     class Meta:
         model = Pick
         fields = ['team']
@@ -35,28 +163,31 @@ class PickForm(forms.ModelForm):
             if self.week:
                 self.instance.week = self.week
         
-        # Initialize the team field with all teams first
-        self.fields['team'].queryset = Team.objects.all()
-        self.fields['team'].widget.attrs.update({
+        team_options = TeamOptions()
+        attrs = {
             'class': 'form-select',
             'aria-label': 'Select team',
-        })
+        }
         
         # If we have both entry and week, we can filter available teams
         if self.entry and self.week:
-            # Get available teams for this entry
-            available_teams = self.entry.get_available_teams(self.week)
+            state = load_entry_pick_state([self.entry], self.week)[self.entry.id]
             
             # If we're editing an existing pick, make sure the current team is included in the options
-            if hasattr(self, 'instance') and self.instance and self.instance.pk and self.instance.team:
-                # Add the current team to the queryset
-                available_teams = available_teams | Team.objects.filter(pk=self.instance.team.pk)
+            current_team_ids = []
+            if hasattr(self, 'instance') and self.instance and self.instance.pk and self.instance.team_id:
+                current_team_ids.append(self.instance.team_id)
             
             # Update the team field to only show available teams
-            self.fields['team'].queryset = available_teams
-            self.fields['team'].label = f"Select your team for Week {self.week.number}"
+            self.fields['team'] = team_options.field(
+                self.week,
+                state['used_team_ids'],
+                current_team_ids,
+                label=f"Select your team for Week {self.week.number}",
+                widget=TeamSelect(attrs=attrs)
+            )
         else:
-            self.fields['team'].label = "Select team"
+            self.fields['team'] = team_options.field(label="Select team", widget=TeamSelect(attrs=attrs))
     
     def clean(self):
         cleaned_data = super().clean()
@@ -119,6 +250,7 @@ class DoublePickForm(forms.Form):
         label="Pick 2",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
+    submission_key = SubmissionKeyField()
     
     def __init__(self, *args, **kwargs):
         self.entry = kwargs.pop('entry', None)
@@ -128,23 +260,28 @@ class DoublePickForm(forms.Form):
         
         if self.entry and self.week:
             # Get available teams for this entry
-            available_teams = self.entry.get_available_teams(self.week)
+            state = load_entry_pick_state([self.entry], self.week)[self.entry.id]
             
             # If we have initial data (i.e., existing picks), make sure those teams are included
-            # in the queryset even if they've been used in another week
-            if hasattr(self, 'initial'):
-                if 'team1' in self.initial and self.initial['team1']:
-                    available_teams = available_teams | Team.objects.filter(pk=self.initial['team1'].pk)
-                if 'team2' in self.initial and self.initial['team2']:
-                    available_teams = available_teams | Team.objects.filter(pk=self.initial['team2'].pk)
+            # even if they've been used in another week
+            current_team_ids = [
+                team.pk for team in (self.initial.get('team1'), self.initial.get('team2')) if team
+            ]
             
             # Update both team fields to show available teams
-            self.fields['team1'].queryset = available_teams
-            self.fields['team2'].queryset = available_teams
-            
-            # Set labels
-            self.fields['team1'].label = f"Pick 1 for Week {self.week.number}"
-            self.fields['team2'].label = f"Pick 2 for Week {self.week.number}"
+            team_options = TeamOptions()
+            self.fields['team1'] = team_options.field(
+                self.week,
+                state['used_team_ids'],
+                current_team_ids,
+                label=f"Pick 1 for Week {self.week.number}"
+            )
+            self.fields['team2'] = team_options.field(
+                self.week,
+                state['used_team_ids'],
+                current_team_ids,
+                label=f"Pick 2 for Week {self.week.number}"
+            )
     
     def clean(self):
         cleaned_data = super().clean()
@@ -162,39 +299,30 @@ class DoublePickForm(forms.Form):
         
         return cleaned_data
     
-    def save(self):
+    def save(self, user=None):
         """
-        Create two Pick objects for the double-pick week.
+        Save both picks for the double-pick week, updating any existing picks in place.
         """
         if not self.is_valid():
             return None
         
-        team1 = self.cleaned_data['team1']
-        team2 = self.cleaned_data['team2']
-        
-        # Create first pick
-        pick1 = Pick(
-            entry=self.entry,
-            week=self.week,
-            team=team1
-        )
-        pick1.save()
-        
-        # Create second pick
-        pick2 = Pick(
-            entry=self.entry,
-            week=self.week,
-            team=team2
+        picks, changed = save_entry_picks(
+            self.entry,
+            self.week,
+            [self.cleaned_data['team1'], self.cleaned_data['team2']],
+            user=user,
+            submission_key=self.cleaned_data.get('submission_key', ''),
         )
-        pick2.save()
         
-        return [pick1, pick2]
+        return picks
 
 
 class QuickPickForm(forms.Form):
     """
     Form for making picks for multiple entries at once.
     """
+    submission_key = SubmissionKeyField()
+    
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         self.week = kwargs.pop('week', None)
@@ -204,42 +332,50 @@ class QuickPickForm(forms.Form):
         super().__init__(*args, **kwargs)
         
         if self.entries and self.week:
+            # One query for the teams and one for every entry's picks, however many entries there are
+            team_options = TeamOptions()
+            self.pick_state = load_entry_pick_state(self.entries, self.week)
+            
             # Create a field for each entry
             for entry in self.entries:
-                available_teams = entry.get_available_teams(self.week)
-                
-                # Get existing picks for this entry to ensure they're included in the dropdown
-                existing_picks = Pick.objects.filter(entry=entry, week=self.week)
-                existing_teams = None
-                if existing_picks.exists():
-                    existing_teams = Team.objects.filter(id__in=existing_picks.values_list('team_id', flat=True))
-                    # Add existing teams to available teams
-                    if existing_teams:
-                        # Create union of available teams and existing teams
-                        available_teams = available_teams | existing_teams
+                state = self.pick_state[entry.id]
+                current_team_ids = [pick.team_id for pick in state['current_picks']]
                 
                 if self.is_double_pick:
                     # For double-pick weeks, create two fields per entry
-                    self.fields[f'entry_{entry.id}_team1'] = forms.ModelChoiceField(
-                        queryset=available_teams,
+                    self.fields[f'entry_{entry.id}_team1'] = team_options.field(
+                        self.week,
+                        state['used_team_ids'],
+                        # Keep the entry's existing picks in the dropdown even if they count as used
+                        current_team_ids,
                         label=f"{entry.entry_name} - Pick 1",
                         required=True,
-                        widget=forms.Select(attrs={'class': 'form-select mb-2'})
+                        widget=TeamSelect(attrs={'class': 'form-select form-select-lg'}, empty_label="--- Select Team ---")
                     )
-                    self.fields[f'entry_{entry.id}_team2'] = forms.ModelChoiceField(
-                        queryset=available_teams,
+                    self.fields[f'entry_{entry.id}_team2'] = team_options.field(
+                        self.week,
+                        state['used_team_ids'],
+                        current_team_ids,
                         label=f"{entry.entry_name} - Pick 2",
                         required=True,
-                        widget=forms.Select(attrs={'class': 'form-select mb-3'})
+                        widget=TeamSelect(attrs={'class': 'form-select form-select-lg'}, empty_label="--- Select Team ---")
                     )
+                    # Pre-populate with the existing picks
+                    if len(current_team_ids) >= 2:
+                        self.initial.setdefault(f'entry_{entry.id}_team1', current_team_ids[0])
+                        self.initial.setdefault(f'entry_{entry.id}_team2', current_team_ids[1])
                 else:
                     # For regular weeks, create one field per entry
-                    self.fields[f'entry_{entry.id}_team'] = forms.ModelChoiceField(
-                        queryset=available_teams,
+                    self.fields[f'entry_{entry.id}_team'] = team_options.field(
+                        self.week,
+                        state['used_team_ids'],
+                        current_team_ids,
                         label=f"{entry.entry_name}",
                         required=True,
-                        widget=forms.Select(attrs={'class': 'form-select mb-3'})
+                        widget=TeamSelect(attrs={'class': 'form-select form-select-lg'}, empty_label="--- Select Team ---")
                     )
+                    if current_team_ids:
+                        self.initial.setdefault(f'entry_{entry.id}_team', current_team_ids[0])
     
     def clean(self):
         cleaned_data = super().clean()
@@ -261,48 +397,29 @@ class QuickPickForm(forms.Form):
         
         return cleaned_data
     
-    def save(self):
+    def save(self, user=None):
         """
-        Create Pick objects for all entries.
+        Apply the submitted picks for all entries.
+        Only entries whose picks changed are written; see apply_pick_assignments.
         """
         if not self.is_valid():
             return None
         
-        picks = []
-        
+        assignments = {}
         for entry in self.entries:
             if self.is_double_pick:
-                # Handle double-pick week
-                team1 = self.cleaned_data[f'entry_{entry.id}_team1']
-                team2 = self.cleaned_data[f'entry_{entry.id}_team2']
-                
-                # Create first pick
-                pick1 = Pick(
-                    entry=entry,
-                    week=self.week,
-                    team=team1
-                )
-                pick1.save()
-                picks.append(pick1)
-                
-                # Create second pick
-                pick2 = Pick(
-                    entry=entry,
-                    week=self.week,
-                    team=team2
-                )
-                pick2.save()
-                picks.append(pick2)
+                assignments[entry] = [
+                    self.cleaned_data[f'entry_{entry.id}_team1'],
+                    self.cleaned_data[f'entry_{entry.id}_team2'],
+                ]
             else:
-                # Handle regular week
-                team = self.cleaned_data[f'entry_{entry.id}_team']
-                
-                pick = Pick(
-                    entry=entry,
-                    week=self.week,
-                    team=team
-                )
-                pick.save()
-                picks.append(pick)
+                assignments[entry] = [self.cleaned_data[f'entry_{entry.id}_team']]
         
-        return picks
+        results = apply_pick_assignments(
+            self.week,
+            assignments,
+            user=user,
+            submission_key=self.cleaned_data.get('submission_key', ''),
+            via="Quick Pick"
+        )
+        return [pick for picks, changed in results.values() for pick in picks]
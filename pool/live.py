@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .db import after_write
+from .models import Entry
+
+
+# Published events are kept this long so reconnecting viewers can catch up
+EVENT_TIMEOUT = 60 * 60
+
+# How often an open stream checks for new events
+POLL_INTERVAL = 2
+
+# Comment lines keep proxies from closing an idle stream
+HEARTBEAT_INTERVAL = 15
+
+# Streams end after this long and the browser reconnects (with Last-Event-ID),
+# so a worker is never tied up indefinitely by one viewer
+STREAM_DURATION = 5 * 60
+
+
+def _sequence_key(pool_id):
+    return f"pool-events-seq:{pool_id}"
+
+
+def _event_key(pool_id, sequence):
+    return f"pool-events:{pool_id}:{sequence}"
+
+
+def publish_pool_event(pool_id, event, data):
+    """
+    Add an event to the pool's live feed. Events live in the cache, so every
+    process sharing the cache sees them; returns the event's sequence number.
+    """
+    cache.add(_sequence_key(pool_id), 0, None)
+    sequence = cache.incr(_sequence_key(pool_id))
+    cache.set(_event_key(pool_id, sequence), {'event': event, 'data': data}, EVENT_TIMEOUT)
+    return sequence
+
+
+def publish_eliminations(week, entries, reason, team=None, result=None):
+    """
+    Tell each affected pool's viewers which entries were just eliminated and how
+    many are still alive. Sent once the surrounding transaction commits and the
+    write lock is released, so a rolled-back result never reaches the feed.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+
+    def publish():
+        pool_ids = {entry.pool_id for entry in entries}
+        alive_counts = dict(
+            Entry.objects.filter(pool_id__in=pool_ids)
+            .values('pool_id')
+            .annotate(alive=Count('id', filter=Q(is_alive=True)))
+            .values_list('pool_id', 'alive')
+        )
+        for pool_id in pool_ids:
+            publish_pool_event(pool_id, 'elimination', {
+                'week': week.number,
+                'reason': reason,
+                'team': str(team) if team else None,
+                'result': result,
+                'eliminated': [
+                    {'id': entry.id, 'name': entry.entry_name}
+                    for entry in entries if entry.pool_id == pool_id
+                ],
+                'alive': alive_counts.get(pool_id, 0),
+            })
+
+    after_write(publish)
+
+
+def _format_event(sequence, event, data):
+    return f"id: {sequence}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def pool_event_stream(pool_id, last_event_id=None):
+    """
+    Yield the pool's events as server-sent events, starting after last_event_id
+    (or from now if the viewer is new). Ends after STREAM_DURATION.
+    """
+    latest = await cache.aget(_sequence_key(pool_id), 0)
+    try:
+        sent = min(int(last_event_id), latest) if last_event_id else latest
+    except ValueError:
+        sent = latest
+
+    # Tell the browser how soon to reconnect when the stream ends
+    yield f"retry: {int(POLL_INTERVAL * 1000)}\n\n"
+
+    started = time.monotonic()
+    last_write = started
+    while time.monotonic() - started < STREAM_DURATION:
+        latest = await cache.aget(_sequence_key(pool_id), 0)
+        if latest > sent:
+            events = await cache.aget_many([_event_key(pool_id, n) for n in range(sent + 1, latest + 1)])
+            for sequence in range(sent + 1, latest + 1):
+                # Events that already expired are skipped
+                item = events.get(_event_key(pool_id, sequence))
+                if item:
+                    yield _format_event(sequence, item['event'], item['data'])
+            sent = latest
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= HEARTBEAT_INTERVAL:
+            yield ": heartbeat\n\n"
+            last_write = time.monotonic()
+
+        await asyncio.sleep(POLL_INTERVAL)
@@ -0,0 +1,284 @@
+import asyncio
+import io
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from pool.models import Pool, Week, Team, Entry, Pick
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent throughput of the read views (home, standings, week picks, '
+        'entry detail) served through the WSGI and ASGI handlers, against a scratch SQLite file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=400,
+            help='Requests per handler'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Requests in flight at once (WSGI worker threads, or concurrent ASGI requests)'
+        )
+        parser.add_argument(
+            '--entries',
+            type=int,
+            default=200,
+            help='Entries in the seeded pool'
+        )
+        parser.add_argument(
+            '--db-latency',
+            type=float,
+            default=0,
+            help='Milliseconds added to every query, to stand in for a database on another host'
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Use a dummy cache so every request rebuilds its page data'
+        )
+        parser.add_argument(
+            '--handler',
+            choices=['wsgi', 'asgi', 'both'],
+            default='both',
+            help='Which handler to run'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.ERROR('The benchmark only applies to the SQLite backend'))
+            return
+
+        original_settings = dict(connection.settings_dict)
+        overrides = {
+            'DEBUG': False,
+            'SECURE_SSL_REDIRECT': False,
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        if options['cold']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        latency = options['db_latency'] / 1000
+
+        def add_latency(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def install_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(add_latency)
+
+        handlers = ['wsgi', 'asgi'] if options['handler'] == 'both' else [options['handler']]
+        results = []
+
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            connections.close_all()
+            connection.settings_dict['NAME'] = os.path.join(scratch_dir, 'benchmark.sqlite3')
+            try:
+                with override_settings(**overrides):
+                    call_command('migrate', verbosity=0, interactive=False)
+                    urls, cookie = self._seed(options['entries'])
+                    connections.close_all()
+
+                    if latency:
+                        connection_created.connect(install_latency)
+                    try:
+                        for handler in handlers:
+                            self.stdout.write(f"Running {handler} handler")
+                            run = self._run_wsgi if handler == 'wsgi' else self._run_asgi
+                            results.append(run(urls, cookie, options))
+                            connections.close_all()
+                    finally:
+                        connection_created.disconnect(install_latency)
+            finally:
+                connections.close_all()
+                connection.settings_dict.update(original_settings)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'handler':<8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['label']:<8} {result['requests']:>9} {result['errors']:>7} "
+                f"{result['throughput']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+            )
+
+    def _run_wsgi(self, urls, cookie, options):
+        """Call the WSGI application from a pool of threads, like a threaded WSGI server"""
+        application = get_wsgi_application()
+
+        def request(n):
+            path, query = self._split(urls[n % len(urls)])
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': query,
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost',
+                'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': io.StringIO(),
+                'wsgi.url_scheme': 'http',
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+                'wsgi.version': (1, 0),
+            }
+            status = []
+            began = time.perf_counter()
+            body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+            try:
+                for _ in body:
+                    pass
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+            return status[0].startswith('200'), time.perf_counter() - began
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            outcomes = list(executor.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - began
+        return self._summarize('wsgi', outcomes, elapsed)
+
+    def _run_asgi(self, urls, cookie, options):
+        """Call the ASGI application directly, with a fixed number of requests in flight"""
+        application = get_asgi_application()
+
+        async def request(n):
+            path, query = self._split(urls[n % len(urls)])
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': query.encode(),
+                'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0),
+                'server': ('localhost', 80),
+            }
+            received = asyncio.Event()
+            status = []
+
+            async def receive():
+                if received.is_set():
+                    # Nothing more to send; wait until the handler stops listening
+                    await asyncio.Event().wait()
+                received.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            began = time.perf_counter()
+            await application(scope, receive, send)
+            return status[0] == 200, time.perf_counter() - began
+
+        async def run():
+            queue = list(range(options['requests']))
+            outcomes = []
+
+            async def worker():
+                while queue:
+                    outcomes.append(await request(queue.pop()))
+
+            await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+            return outcomes
+
+        began = time.perf_counter()
+        outcomes = asyncio.run(run())
+        elapsed = time.perf_counter() - began
+        return self._summarize('asgi', outcomes, elapsed)
+
+    def _summarize(self, label, outcomes, elapsed):
+        times = sorted(duration for ok, duration in outcomes)
+        return {
+            'label': label,
+            'requests': len(outcomes),
+            'errors': sum(1 for ok, duration in outcomes if not ok),
+            'throughput': len(outcomes) / elapsed if elapsed else 0,
+            'p50_ms': statistics.median(times) * 1000 if times else 0,
+            'p95_ms': times[int(len(times) * 0.95) - 1] * 1000 if times else 0,
+        }
+
+    def _split(self, url):
+        path, _, query = url.partition('?')
+        return path, query
+
+    def _seed(self, entry_count):
+        """
+        One pool with a finished week (picks revealed) and a week in progress.
+        Returns the URLs to request and a logged-in session cookie.
+        """
+        User = get_user_model()
+        user = User.objects.create_user('benchmark', 'benchmark@example.com', 'benchmark')
+
+        now = timezone.now()
+        last_week = Week.objects.create(
+            number=1,
+            start_date=now - timedelta(days=8),
+            end_date=now - timedelta(days=1),
+            deadline=now - timedelta(days=5),
+            email_sent=True,
+        )
+        current_week = Week.objects.create(
+            number=2,
+            start_date=now - timedelta(days=1),
+            end_date=now + timedelta(days=6),
+            deadline=now + timedelta(days=2),
+        )
+        pool = Pool.objects.create(name='Benchmark Pool', year=now.year, created_by=user)
+        pool.weeks.add(last_week, current_week)
+
+        teams = [
+            Team.objects.create(name=f'Team {i}', city=f'City {i}', abbreviation=f'B{i}', conference='AFC', division='East')
+            for i in range(32)
+        ]
+        entries = Entry.objects.bulk_create([
+            Entry(pool=pool, user=user, entry_name=f'benchmark {i + 1}')
+            for i in range(entry_count)
+        ])
+        Pick.objects.bulk_create([
+            Pick(entry=entry, week=last_week, team=teams[i % len(teams)], result='win')
+            for i, entry in enumerate(entries)
+        ])
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        urls = [
+            reverse('home'),
+            reverse('standings', args=[pool.id]),
+            reverse('standings', args=[pool.id]) + '?tab=previous_distribution',
+            reverse('week_picks', args=[pool.id, last_week.number]),
+            reverse('entry_detail', args=[entries[0].id]),
+        ]
+        return urls, cookie
@@ -0,0 +1,120 @@
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from pool import rules
+
+
+class Command(BaseCommand):
+    help = 'Measures how fast the survival rules kernel (pool.rules) decides weeks and replays seasons, in memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries',
+            type=int,
+            default=20000,
+            help='Entries per pool'
+        )
+        parser.add_argument(
+            '--pools',
+            type=int,
+            default=4,
+            help='Pools in the season run'
+        )
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=18,
+            help='Weeks in the season run'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement; the fastest is reported'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Most worker processes in the scaling run (it tries 1, 2, 4, ... up to this)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the generated picks'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        entries = options['entries']
+        rows = []
+
+        # One pool's week, single-pick and double-pick, with a few games still to play
+        results = ('win', 'win', 'loss', 'tie', 'pending')
+        single = {entry: [rng.choice(results)] for entry in range(entries)}
+        double = {entry: [rng.choice(results), rng.choice(results)] for entry in range(entries)}
+        rows.append(('single-pick week', entries, self._time(lambda: rules.decide_week({0: single}, set()), options)))
+        rows.append(('double-pick week', entries, self._time(lambda: rules.decide_week({0: double}, {0}), options)))
+
+        # A whole season: every pool, every week, carrying survivors forward, as verify_pool_state replays it
+        pools = options['pools']
+        weeks = options['weeks']
+        doubles = [week % 6 == 0 for week in range(1, weeks + 1)]
+        payloads = []
+        picks = 0
+        for pool in range(pools):
+            entry_picks = []
+            for entry in range(entries):
+                # Mostly wins, so the field thins out over the season rather than in week one
+                codes = tuple(
+                    ''.join('W' if rng.random() < 0.85 else 'L' for _ in range(2 if double else 1))
+                    for double in doubles
+                )
+                entry_picks.append((codes, 0))
+                picks += sum(len(week_codes) for week_codes in codes)
+            payloads.append(([(double, True) for double in doubles], entry_picks))
+        season = self._time(lambda: rules.replay_pools(payloads), options)
+        rows.append((f'{weeks}-week season, {pools} pools', picks, season))
+
+        self.stdout.write(f"{'run':<28} {'picks':>10} {'ms':>10} {'picks/s':>14}")
+        for label, count, elapsed in rows:
+            self.stdout.write(f"{label:<28} {count:>10} {elapsed * 1000:>10.1f} {count / elapsed:>14,.0f}")
+
+        # The same season split by pool across worker processes, as the results paths and
+        # verify_pool_state do with SURVIVAL_WORKERS, including starting the workers and shipping them the data
+        week_payload = {pool: {entry: ['win', 'pending'] if pool % 2 else ['win'] for entry in range(entries)} for pool in range(pools)}
+        double_pools = {pool for pool in range(pools) if pool % 2}
+
+        worker_counts = []
+        workers = 1
+        while workers < options['workers']:
+            worker_counts.append(workers)
+            workers *= 2
+        worker_counts.append(options['workers'])
+
+        self.stdout.write('')
+        self.stdout.write(f"{'workers':>8} {'season ms':>10} {'speedup':>8} {'week ms':>10} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts:
+            season = self._time(lambda: rules.replay_pools(payloads, workers=workers, min_entries=0), options)
+            week = self._time(lambda: rules.decide_week(week_payload, double_pools, workers=workers, min_entries=0), options)
+            baseline = baseline or (season, week)
+            self.stdout.write(
+                f"{workers:>8} {season * 1000:>10.1f} {baseline[0] / season:>7.2f}x "
+                f"{week * 1000:>10.1f} {baseline[1] / week:>7.2f}x"
+            )
+        self.stdout.write(
+            f"Pools are decided in worker processes from {rules.PARALLEL_MIN_ENTRIES} entries when SURVIVAL_WORKERS > 1"
+        )
+
+    def _time(self, run, options):
+        """Fastest of --repeat runs, in seconds"""
+        timings = []
+        for _ in range(options['repeat']):
+            began = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - began)
+        return min(timings)
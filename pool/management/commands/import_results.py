@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from pool.models import Week, Team
+from pool.pages import warm_pool_pages
+from pool.results import parse_scores, results_from_scores, record_week_results, preview_week_results
+
+
+class Command(BaseCommand):
+    help = "Sets a week's results from a CSV or JSON file of final scores and runs the eliminations in one pass"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="CSV or JSON file with home, away, home_points and away_points for each game"
+        )
+        parser.add_argument(
+            "--week",
+            type=int,
+            required=True,
+            help="Week number the scores belong to"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show the results and who would be eliminated without saving anything"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            week = Week.objects.get(number=options['week'])
+        except Week.DoesNotExist:
+            raise CommandError(f"Week {options['week']} not found")
+
+        try:
+            with open(options['path'], encoding='utf-8') as f:
+                games = parse_scores(f.read(), options['path'])
+            submitted = results_from_scores(games)
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        teams = Team.objects.in_bulk(submitted.keys())
+        for team_id, (result, notes) in sorted(submitted.items(), key=lambda item: str(teams[item[0]])):
+            self.stdout.write(f"{str(teams[team_id]):<28} {result:<5} {notes}")
+
+        if options['dry_run']:
+            eliminated = preview_week_results(week, submitted)
+        else:
+            eliminated = record_week_results(week, submitted)
+            warm_pool_pages(week)
+
+        # A double-pick elimination can be credited to a team from an earlier result
+        teams.update(Team.objects.in_bulk(eliminated.keys() - teams.keys()))
+
+        self.stdout.write('')
+        for team_id, entries in eliminated.items():
+            self.stdout.write(f"{teams[team_id]}:")
+            for entry in sorted(entries, key=lambda entry: (entry.pool_id, entry.entry_name)):
+                self.stdout.write(f"  {entry.pool.name}: {entry.entry_name}")
+
+        total = sum(len(entries) for entries in eliminated.values())
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run: {len(games)} games for Week {week.number} would eliminate {total} entries"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Recorded {len(games)} games for Week {week.number} and eliminated {total} entries"
+            ))
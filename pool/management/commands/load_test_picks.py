@@ -0,0 +1,233 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from pool.picks import save_entry_picks
+from pool.models import Pool, Week, Team, Entry, Pick, PoolWeekSettings, AuditLog
+
+
+# Stock SQLite as the project originally shipped it: rollback journal, driver
+# default timeout, no write lock.
+BASELINE_PROFILE = {
+    'label': 'baseline',
+    'pragmas': {},
+    'options': {},
+    'serialize': False,
+}
+
+
+class Command(BaseCommand):
+    help = 'Simulate the deadline pick rush against a scratch SQLite file and compare baseline vs tuned settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=8,
+            help='Number of concurrent threads submitting picks'
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=4,
+            help='Number of concurrent threads reading pool pages while picks are written'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Pick submissions per writer thread'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=['baseline', 'tuned', 'both'],
+            default='both',
+            help='Which database profile to run'
+        )
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        tuned_profile = {
+            'label': 'tuned',
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'options': settings.DATABASES[DEFAULT_DB_ALIAS].get('OPTIONS', {}),
+            'serialize': True,
+        }
+        profiles = {
+            'baseline': [BASELINE_PROFILE],
+            'tuned': [tuned_profile],
+            'both': [BASELINE_PROFILE, tuned_profile],
+        }[options['profile']]
+
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.ERROR('The load test only applies to the SQLite backend'))
+            return
+
+        original_settings = dict(connection.settings_dict)
+        results = []
+
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            for profile in profiles:
+                db_path = os.path.join(scratch_dir, f"{profile['label']}.sqlite3")
+                self.stdout.write(f"Running {profile['label']} profile against {db_path}")
+                try:
+                    results.append(self._run_profile(profile, db_path, options))
+                finally:
+                    connections.close_all()
+                    connection.settings_dict.update(original_settings)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'profile':<10} {'writes':>8} {'errors':>8} {'error %':>8} {'writes/s':>10} {'reads/s':>10} {'p95 write ms':>13}")
+        for result in results:
+            self.stdout.write(
+                f"{result['label']:<10} {result['writes']:>8} {result['write_errors']:>8} "
+                f"{result['error_rate']:>7.1f}% {result['write_throughput']:>10.1f} "
+                f"{result['read_throughput']:>10.1f} {result['p95_write_ms']:>13.1f}"
+            )
+
+    def _run_profile(self, profile, db_path, options):
+        """Create a fresh database, seed it, and hammer it from several threads."""
+        connections.close_all()
+        connection.settings_dict['NAME'] = db_path
+        connection.settings_dict['OPTIONS'] = dict(profile['options'])
+
+        with override_settings(
+            SQLITE_PRAGMAS=profile['pragmas'],
+            SQLITE_SERIALIZE_WRITES=profile['serialize'],
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        ):
+            call_command('migrate', verbosity=0, interactive=False)
+            week, entries, teams = self._seed(options['writers'])
+            connections.close_all()
+
+            stats = {
+                'writes': 0,
+                'write_errors': 0,
+                'reads': 0,
+                'read_errors': 0,
+                'write_times': [],
+            }
+            stats_lock = threading.Lock()
+            writers_done = threading.Event()
+            start = threading.Barrier(options['writers'] + options['readers'] + 1)
+
+            def writer(entry):
+                start.wait()
+                try:
+                    for i in range(options['iterations']):
+                        team = teams[i % len(teams)]
+                        began = time.perf_counter()
+                        try:
+                            self._submit_pick(entry, week, team, profile['serialize'])
+                        except OperationalError:
+                            with stats_lock:
+                                stats['write_errors'] += 1
+                        else:
+                            with stats_lock:
+                                stats['writes'] += 1
+                                stats['write_times'].append(time.perf_counter() - began)
+                finally:
+                    connections.close_all()
+
+            def reader():
+                start.wait()
+                try:
+                    while not writers_done.is_set():
+                        try:
+                            Entry.objects.filter(pool=entries[0].pool, is_alive=True).count()
+                            list(Pick.objects.filter(week=week).values('team').distinct())
+                        except OperationalError:
+                            with stats_lock:
+                                stats['read_errors'] += 1
+                        else:
+                            with stats_lock:
+                                stats['reads'] += 1
+                finally:
+                    connections.close_all()
+
+            writer_threads = [threading.Thread(target=writer, args=(entry,)) for entry in entries]
+            reader_threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+            for thread in writer_threads + reader_threads:
+                thread.start()
+
+            start.wait()
+            began = time.perf_counter()
+            for thread in writer_threads:
+                thread.join()
+            elapsed = time.perf_counter() - began
+            writers_done.set()
+            for thread in reader_threads:
+                thread.join()
+
+        attempts = stats['writes'] + stats['write_errors']
+        write_times = sorted(stats['write_times'])
+        p95 = write_times[int(len(write_times) * 0.95) - 1] if write_times else 0
+
+        return {
+            'label': profile['label'],
+            'writes': stats['writes'],
+            'write_errors': stats['write_errors'],
+            'error_rate': (stats['write_errors'] / attempts * 100) if attempts else 0,
+            'write_throughput': stats['writes'] / elapsed if elapsed else 0,
+            'read_throughput': stats['reads'] / elapsed if elapsed else 0,
+            'p95_write_ms': p95 * 1000,
+        }
+
+    def _submit_pick(self, entry, week, team, serialize):
+        """
+        Tuned profile: the make_pick write path (locked in-place upsert).
+        Baseline: the original make_pick sequence of read, delete, insert in autocommit mode.
+        """
+        if serialize:
+            save_entry_picks(entry, week, [team], user=entry.user)
+            return
+
+        existing_pick = Pick.objects.filter(entry=entry, week=week).first()
+        old_team = existing_pick.team if existing_pick else None
+
+        Pick.objects.filter(entry=entry, week=week).delete()
+        pick = Pick(entry=entry, week=week, team=team)
+        pick.save()
+
+        if old_team:
+            details = f"{entry.entry_name} changed pick for Week {week.number} from {old_team} to {team}"
+            AuditLog.create(entry.user, "PICK_CHANGED", entry, week, details)
+        else:
+            details = f"{entry.entry_name} picked {team} for Week {week.number}"
+            AuditLog.create(entry.user, "PICK_CREATED", entry, week, details)
+
+    def _seed(self, entry_count):
+        """Create one open week, one pool and an entry per writer thread."""
+        User = get_user_model()
+        user = User.objects.create_user('loadtest', 'loadtest@example.com', 'loadtest')
+
+        now = timezone.now()
+        week = Week.objects.create(
+            number=1,
+            description='Load test week',
+            start_date=now - timedelta(days=1),
+            end_date=now + timedelta(days=6),
+            deadline=now + timedelta(days=2),
+        )
+        pool = Pool.objects.create(name='Load Test Pool', year=now.year, created_by=user)
+        PoolWeekSettings.objects.create(pool=pool, week=week, is_double=False)
+
+        teams = [
+            Team.objects.create(name=f'Team {i}', city=f'City {i}', abbreviation=f'T{i}', conference='AFC', division='East')
+            for i in range(4)
+        ]
+        entries = [
+            Entry.objects.create(pool=pool, user=user, entry_name=f'loadtest {i + 1}')
+            for i in range(entry_count)
+        ]
+        return week, entries, teams
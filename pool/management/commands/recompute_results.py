@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from pool.models import Week
+from pool.pages import warm_pool_pages
+from pool.results import recompute_results
+
+
+class Command(BaseCommand):
+    help = "Rebuilds pick results and entry statuses from the recorded weekly results, for a week or the rest of the season"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--week",
+            type=int,
+            required=True,
+            help="First week to recompute"
+        )
+        parser.add_argument(
+            "--through",
+            type=int,
+            help="Last week to recompute (defaults to the end of the season)"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show what would change without saving anything"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            first_week = Week.objects.get(number=options['week'])
+            last_week = Week.objects.get(number=options['through']) if options['through'] is not None else None
+        except Week.DoesNotExist:
+            raise CommandError(f"Week {options['through'] if options['through'] is not None else options['week']} not found")
+        if last_week is not None and last_week.number < first_week.number:
+            raise CommandError("--through must not be before --week")
+
+        with transaction.atomic():
+            changes = recompute_results(first_week, last_week)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        for label in ('eliminated', 'moved', 'revived'):
+            for entry in sorted(changes[label], key=lambda entry: (entry.pool_id, entry.entry_name)):
+                week = f" in Week {entry.eliminated_in_week.number}" if entry.eliminated_in_week else ''
+                self.stdout.write(f"{label:<10} {entry.pool.name}: {entry.entry_name}{week}")
+
+        summary = (
+            f"{changes['picks']} pick results, {len(changes['eliminated'])} eliminated, "
+            f"{len(changes['revived'])} revived, {len(changes['moved'])} moved"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: recomputing would change {summary}"))
+        else:
+            if changes['picks'] or changes['eliminated'] or changes['revived'] or changes['moved']:
+                warm_pool_pages(first_week)
+            self.stdout.write(self.style.SUCCESS(f"Recomputed from Week {first_week.number}: {summary}"))
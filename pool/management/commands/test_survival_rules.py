@@ -0,0 +1,260 @@
+import itertools
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from pool import rules
+from pool.simulator import WeekSimulator
+import pool.simulator as simulator_module
+
+
+RESULTS = ('win', 'loss', 'tie', 'pending')
+
+
+class Command(BaseCommand):
+    help = 'Checks the survival rules kernel (pool.rules) against its properties on random pools'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Random pools to check per property'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, to reproduce a failure'
+        )
+
+    def handle(self, *args, **options):
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        self.stdout.write(f"Seed {seed}")
+
+        properties = [
+            ('single-pick weeks: a win advances, a loss or tie or no pick eliminates', self._check_single),
+            ('double-pick weeks: two wins always advance, no wins always eliminates', self._check_double_extremes),
+            ('double-pick weeks: one win advances only when nobody has two', self._check_double_one_win),
+            ('a week with every result in has nothing pending', self._check_complete),
+            ('decided statuses hold for every way the pending games can finish', self._check_exact),
+            ('statuses do not depend on entry order', self._check_order),
+            ('replay_pools matches deciding the weeks one at a time with decide_week', self._check_weeks),
+            ('the simulator agrees with the kernel', self._check_simulator),
+            ('decide_week and replay_pools match, in worker processes too', self._check_pools),
+        ]
+
+        failures = 0
+        for name, check in properties:
+            rng = random.Random(seed)
+            counterexample = None
+            for _ in range(options['iterations']):
+                counterexample = check(rng)
+                if counterexample is not None:
+                    break
+            if counterexample is None:
+                self.stdout.write(self.style.SUCCESS(f"ok      {name}"))
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAILED  {name}"))
+                self.stdout.write(f"        {counterexample}")
+
+        if failures:
+            raise CommandError(f"{failures} of {len(properties)} properties failed (seed {seed})")
+        self.stdout.write(self.style.SUCCESS(f"All {len(properties)} properties hold"))
+
+    def _random_week(self, rng, is_double, results=RESULTS):
+        """A pool's week: entry -> pick results, with the odd missing pick"""
+        picks = 2 if is_double else 1
+        return {
+            f"entry{i}": [rng.choice(results) for _ in range(rng.choice([picks] * 8 + list(range(picks))))]
+            for i in range(rng.randint(1, 8))
+        }
+
+    def _check_single(self, rng):
+        week = self._random_week(rng, False)
+        statuses = rules.week_statuses(week, False)
+        for entry, results in week.items():
+            if not results or any(result in ('loss', 'tie') for result in results):
+                expected = rules.ELIMINATED
+            elif 'pending' in results:
+                expected = rules.PENDING
+            else:
+                expected = rules.ADVANCED
+            if statuses[entry] != expected:
+                return (week, entry, statuses[entry])
+
+    def _check_double_extremes(self, rng):
+        week = self._random_week(rng, True)
+        statuses = rules.week_statuses(week, True)
+        for entry, results in week.items():
+            if results.count('win') >= 2 and statuses[entry] != rules.ADVANCED:
+                return (week, entry, statuses[entry])
+            if 'win' not in results and 'pending' not in results and statuses[entry] != rules.ELIMINATED:
+                return (week, entry, statuses[entry])
+
+    def _check_double_one_win(self, rng):
+        week = self._random_week(rng, True, results=('win', 'loss', 'tie'))
+        statuses = rules.week_statuses(week, True)
+        someone_has_two = any(results.count('win') >= 2 for results in week.values())
+        for entry, results in week.items():
+            if results.count('win') == 1:
+                expected = rules.ELIMINATED if someone_has_two else rules.ADVANCED
+                if statuses[entry] != expected:
+                    return (week, entry, statuses[entry])
+
+    def _check_complete(self, rng):
+        is_double = rng.random() < 0.5
+        week = self._random_week(rng, is_double, results=('win', 'loss', 'tie'))
+        statuses = rules.week_statuses(week, is_double)
+        if rules.PENDING in statuses.values():
+            return (is_double, week, statuses)
+
+    def _check_exact(self, rng):
+        """
+        Brute force every way the pending picks can finish: a decided status must
+        be the final status in all of them, and a pending one must not be.
+        """
+        is_double = rng.random() < 0.5
+        week = self._random_week(rng, is_double)
+        pending = [(entry, i) for entry, results in week.items() for i, result in enumerate(results) if result == 'pending']
+        if len(pending) > 10:
+            return None
+
+        statuses = rules.week_statuses(week, is_double)
+        finals = {entry: set() for entry in week}
+        for outcome in itertools.product(('win', 'loss'), repeat=len(pending)):
+            completed = {entry: list(results) for entry, results in week.items()}
+            for (entry, i), result in zip(pending, outcome):
+                completed[entry][i] = result
+            for entry, status in rules.week_statuses(completed, is_double).items():
+                finals[entry].add(status)
+
+        for entry, status in statuses.items():
+            if status == rules.PENDING and len(finals[entry]) < 2:
+                return (is_double, week, entry, 'pending but always', finals[entry])
+            if status != rules.PENDING and finals[entry] != {status}:
+                return (is_double, week, entry, status, 'but can end', finals[entry])
+
+    def _check_order(self, rng):
+        is_double = rng.random() < 0.5
+        week = self._random_week(rng, is_double)
+        entries = list(week.items())
+        rng.shuffle(entries)
+        shuffled = {entry: list(reversed(results)) for entry, results in entries}
+        if rules.week_statuses(week, is_double) != rules.week_statuses(shuffled, is_double):
+            return (is_double, week)
+
+    def _random_season(self, rng, pools=3, weeks=4):
+        """
+        Random pools over several weeks, as replay_pools takes them: the odd
+        missing pick, late entries, and a clock that can stop before, during
+        or after the last week, run through rules.missed_pick_weeks
+        """
+        windows = [(week * 10, week * 10 + 7) for week in range(weeks)]
+        now = rng.choice([windows[-1][0] - 1, windows[-1][0] + 1, windows[-1][1] + 1])
+        required = set(rules.missed_pick_weeks(windows, now))
+        payloads = []
+        for _ in range(pools):
+            doubles = [rng.random() < 0.3 for _ in range(weeks)]
+            entry_picks = []
+            for _ in range(rng.randint(1, 8)):
+                created_at = rng.choice([-1, -1, -1, rng.randint(0, weeks * 10)])
+                codes = []
+                for is_double in doubles:
+                    count = 2 if is_double else 1
+                    if rng.random() < 0.1:
+                        count -= 1
+                    codes.append(''.join(rules.RESULT_CODES[rng.choice(RESULTS)] for _ in range(count)))
+                first_required = min(rules.missed_pick_weeks(windows, now, created_at), default=weeks)
+                entry_picks.append((tuple(codes), first_required))
+            payloads.append(([(is_double, week in required) for week, is_double in enumerate(doubles)], entry_picks))
+        return payloads
+
+    def _replay_by_weeks(self, payloads):
+        """The season the way the results paths settle it: one decide_week call per week, carrying survivors"""
+        outcomes = [[None] * len(entry_picks) for pool_weeks, entry_picks in payloads]
+        alive = [list(range(len(entry_picks))) for pool_weeks, entry_picks in payloads]
+        for week in range(len(payloads[0][0])):
+            results_by_pool = {}
+            for pool, (pool_weeks, entry_picks) in enumerate(payloads):
+                results_by_pool[pool] = {}
+                for i in alive[pool]:
+                    codes, first_required = entry_picks[i]
+                    if codes[week]:
+                        results_by_pool[pool][i] = [rules.RESULTS_BY_CODE[code] for code in codes[week]]
+                    elif pool_weeks[week][1] and week >= first_required:
+                        outcomes[pool][i] = (week, True)
+            double_pools = {pool for pool, (pool_weeks, entry_picks) in enumerate(payloads) if pool_weeks[week][0]}
+            for pool, statuses in rules.decide_week(results_by_pool, double_pools).items():
+                for i, status in statuses.items():
+                    if status == rules.ELIMINATED:
+                        outcomes[pool][i] = (week, False)
+            alive = [[i for i in entries if outcomes[pool][i] is None] for pool, entries in enumerate(alive)]
+        return outcomes
+
+    def _check_weeks(self, rng):
+        payloads = self._random_season(rng)
+        replayed = rules.replay_pools(payloads)
+        expected = self._replay_by_weeks(payloads)
+        if replayed != expected:
+            return (payloads, replayed, expected)
+
+    def _check_simulator(self, rng):
+        """evaluate() against the kernel entry by entry, and NumPy enumeration against the Python one"""
+        teams = list(range(1, rng.randint(3, 9)))
+        groups = {}
+        double_pools = {pool for pool in (1, 2) if rng.random() < 0.5}
+        for pool in (1, 2):
+            for _ in range(rng.randint(1, 5)):
+                size = min(2 if pool in double_pools else 1, len(teams))
+                if rng.random() < 0.1:
+                    size -= 1
+                key = (pool, tuple(sorted(rng.sample(teams, size))))
+                groups[key] = groups.get(key, 0) + rng.randint(1, 3)
+        known = {team: rng.choice(('win', 'loss', 'tie')) for team in teams if rng.random() < 0.3}
+        simulator = WeekSimulator(groups, double_pools, known, past_deadline=rng.random() < 0.5)
+
+        scenario = {team: rng.choice(('win', 'loss', 'tie')) for team in simulator.pending_teams if rng.random() < 0.5}
+        combined = {**known, **scenario}
+        expected = {pool: 0 for pool in simulator.pool_ids}
+        for pool in simulator.pool_ids:
+            # One kernel entry per entry, not per group
+            week = {}
+            for (group_pool, team_ids), count in groups.items():
+                if group_pool == pool and team_ids:
+                    for n in range(count):
+                        week[(team_ids, n)] = [combined.get(team, 'pending') for team in team_ids]
+                elif group_pool == pool and not simulator.past_deadline:
+                    expected[pool] += count
+            statuses = rules.week_statuses(week, pool in double_pools)
+            expected[pool] += sum(1 for status in statuses.values() if status != rules.ELIMINATED)
+        if simulator.evaluate(scenario) != expected:
+            return ('evaluate', groups, double_pools, known, scenario, simulator.evaluate(scenario), expected)
+
+        if simulator_module.np is not None:
+            games = [tuple(rng.sample(simulator.pending_teams, 2))] if len(simulator.pending_teams) >= 2 else []
+            vectorized = simulator.enumerate(games)
+            numpy = simulator_module.np
+            simulator_module.np = None
+            try:
+                plain = simulator.enumerate(games)
+            finally:
+                simulator_module.np = numpy
+            if vectorized != plain:
+                return ('enumerate', groups, double_pools, known, games, vectorized, plain)
+
+    def _check_pools(self, rng):
+        """decide_week and replay_pools against their one-pool kernels; now and then through a process pool"""
+        workers = 2 if rng.random() < 0.02 else 1
+        pools = ['a', 'b', 'c']
+        double_pools = {pool for pool in pools if rng.random() < 0.4}
+        results_by_pool = {pool: self._random_week(rng, pool in double_pools) for pool in pools}
+        expected = {pool: rules.week_statuses(week, pool in double_pools) for pool, week in results_by_pool.items()}
+        decided = rules.decide_week(results_by_pool, double_pools, workers=workers, min_entries=0)
+        if decided != expected:
+            return ('decide_week', workers, results_by_pool, double_pools, decided, expected)
+
+        payloads = self._random_season(rng)
+        expected = [rules.replay_pool(pool_weeks, entry_picks) for pool_weeks, entry_picks in payloads]
+        replayed = rules.replay_pools(payloads, workers=workers, min_entries=0)
+        if replayed != expected:
+            return ('replay_pools', workers, payloads, replayed, expected)
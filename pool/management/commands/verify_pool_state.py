@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pool.models import Pool
+from pool.verify import verify_pool_state
+
+
+class Command(BaseCommand):
+    help = "Replays the season's picks and results and reports entries whose alive/eliminated state doesn't match"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pool",
+            type=int,
+            action="append",
+            dest="pools",
+            help="Pool id to check (repeatable; defaults to every active pool)"
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Correct the entries and pick results that are wrong"
+        )
+
+    def handle(self, *args, **options):
+        if options['pools']:
+            missing = set(options['pools']) - set(Pool.objects.filter(pk__in=options['pools']).values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"Pool {', '.join(str(pool_id) for pool_id in sorted(missing))} not found")
+
+        began = time.perf_counter()
+        report = verify_pool_state(options['pools'], fix=options['fix'])
+        elapsed = time.perf_counter() - began
+
+        for entry, week, reason in report['wrong']:
+            expected = f"eliminated in Week {week.number} ({reason})" if week else 'alive'
+            if options['fix']:
+                # The fix has already brought the entry in line
+                self.stdout.write(f"FIXED  {entry.pool.name}: {entry.entry_name} - now {expected}")
+            else:
+                actual = f"eliminated in Week {entry.eliminated_in_week.number}" if entry.eliminated_in_week else 'alive'
+                self.stdout.write(f"WRONG  {entry.pool.name}: {entry.entry_name} - {actual}, rules say {expected}")
+        for entry, week, reason in report['overridden']:
+            expected = f"eliminated in Week {week.number} ({reason})" if week else 'alive'
+            actual = f"eliminated in Week {entry.eliminated_in_week.number}" if entry.eliminated_in_week else 'alive'
+            self.stdout.write(f"ADMIN  {entry.pool.name}: {entry.entry_name} - {actual} by hand, rules say {expected}")
+
+        summary = (
+            f"{report['entries']} entries checked in {elapsed:.2f}s: {len(report['wrong'])} wrong, "
+            f"{len(report['overridden'])} overridden by an admin, {report['stale_picks']} pick results out of date"
+        )
+        if not report['wrong'] and not report['stale_picks']:
+            self.stdout.write(self.style.SUCCESS(summary))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{summary}; all fixed"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{summary}; run with --fix to correct them"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from pool.models import Week
+from pool.pages import warm_pool_pages
+
+
+class Command(BaseCommand):
+    help = "Pre-builds the cached standings, week picks and pool summaries for every active pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--week",
+            type=int,
+            help="Week number whose picks to warm, in addition to the current week (optional)"
+        )
+
+    def handle(self, *args, **options):
+        week = None
+        if options.get('week'):
+            try:
+                week = Week.objects.get(number=options['week'])
+            except Week.DoesNotExist:
+                self.stdout.write(self.style.ERROR(f"Week {options['week']} not found"))
+                return
+
+        timings = warm_pool_pages(week)
+        for pool, elapsed in timings:
+            self.stdout.write(f"{pool.name}: {elapsed * 1000:.1f} ms")
+
+        total = sum(elapsed for _, elapsed in timings)
+        self.stdout.write(self.style.SUCCESS(f"Warmed {len(timings)} pools in {total * 1000:.1f} ms"))
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, close_old_connections
+from pool.db import serialized_write
+from pool.models import Week, ResultsFile
+from pool.pages import warm_pool_pages
+from pool.results import parse_scores, results_from_scores, record_week_results
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+RESULT_EXTENSIONS = ('.csv', '.json')
+
+
+class Command(BaseCommand):
+    help = (
+        "Watches a directory for result drop files (CSV or JSON final scores, as for import_results) "
+        "and applies each one as it arrives"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directory",
+            help="Directory that score files are dropped into"
+        )
+        parser.add_argument(
+            "--week",
+            type=int,
+            help="Week number to apply the files to (defaults to the current week when each file arrives)"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="Seconds between scans of the directory"
+        )
+        parser.add_argument(
+            "--settle",
+            type=float,
+            default=2,
+            help="When polling, skip files modified within this many seconds, as they may still be being written"
+        )
+        parser.add_argument(
+            "--poll",
+            action="store_true",
+            help="Poll even if inotify_simple is installed"
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Apply whatever is in the directory and exit (for running from cron)"
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory")
+
+        week = None
+        if options.get('week'):
+            try:
+                week = Week.objects.get(number=options['week'])
+            except Week.DoesNotExist:
+                raise CommandError(f"Week {options['week']} not found")
+
+        if options['once']:
+            self._scan(directory, week, options['settle'])
+            return
+
+        # inotify wakes the watcher as soon as a file is closed or moved in; polling is the fallback
+        inotify = None
+        if INotify is not None and not options['poll']:
+            inotify = INotify()
+            inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO)
+            self.stdout.write(f"Watching {directory} with inotify")
+        else:
+            self.stdout.write(f"Watching {directory}, polling every {options['interval']:g}s")
+
+        try:
+            while True:
+                close_old_connections()
+                # Files are complete once inotify reports them, so only polling needs to wait for writes to settle
+                self._scan(directory, week, 0 if inotify else options['settle'])
+                if inotify:
+                    # Also rescan every interval, in case an event was missed
+                    inotify.read(timeout=int(options['interval'] * 1000))
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+
+    def _scan(self, directory, week, settle):
+        """Apply every settled result file in the directory that isn't in the ledger yet, oldest first"""
+        now = time.time()
+        paths = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith('.') or not name.lower().endswith(RESULT_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            modified = os.path.getmtime(path)
+            if now - modified >= settle:
+                paths.append((modified, name, path))
+
+        for modified, name, path in sorted(paths):
+            with open(path, 'rb') as f:
+                content = f.read()
+            checksum = hashlib.sha256(content).hexdigest()
+            if ResultsFile.objects.filter(checksum=checksum).exists():
+                continue
+            self._apply(name, content, checksum, week or Week.get_current())
+
+    def _apply(self, name, content, checksum, week):
+        try:
+            if week is None:
+                raise ValueError("No current week to apply results to")
+            games = parse_scores(content.decode('utf-8'), name)
+            submitted = results_from_scores(games)
+        except (UnicodeDecodeError, ValueError) as e:
+            # Recorded so a bad file isn't retried every scan; fixing its contents changes the checksum
+            ResultsFile.objects.get_or_create(checksum=checksum, defaults={'name': name, 'week': week, 'error': str(e)})
+            self.stdout.write(self.style.ERROR(f"{name}: {e}"))
+            return
+
+        try:
+            # The ledger row and the results commit together, so a crash can't leave one without the other
+            with serialized_write():
+                ledger = ResultsFile.objects.create(name=name, checksum=checksum, week=week, games=len(games))
+                eliminated = record_week_results(week, submitted)
+                ledger.eliminated = sum(len(entries) for entries in eliminated.values())
+                ledger.save(update_fields=['eliminated'])
+        except IntegrityError:
+            # Another watcher applied the same file first
+            return
+
+        warm_pool_pages(week)
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: applied {len(games)} games to Week {week.number}, eliminated {ledger.eliminated} entries"
+        ))
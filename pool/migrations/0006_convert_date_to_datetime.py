@@ -7,9 +7,10 @@ from django.utils import timezone
 def convert_dates_to_datetime(apps, schema_editor):
     # Get the historical model
     Week = apps.get_model('pool', 'Week')
+    db_alias = schema_editor.connection.alias
     
     # Iterate through all weeks and convert date fields to datetime
-    for week in Week.objects.all():
+    for week in Week.objects.using(db_alias).all():
         # Check if the start_date is already a datetime object
         if not isinstance(week.start_date, timezone.datetime):
             # Convert date to datetime with midnight time
@@ -37,7 +38,7 @@ def convert_dates_to_datetime(apps, schema_editor):
                 )
         
         # Save the changes
-        week.save()
+        week.save(using=db_alias)
 
 
 class Migration(migrations.Migration):
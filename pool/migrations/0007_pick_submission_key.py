@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pool', '0006_convert_date_to_datetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pick',
+            name='submission_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pool', '0007_pick_submission_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoolSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_entries', models.PositiveIntegerField(default=0)),
+                ('alive_entries', models.PositiveIntegerField(default=0)),
+                ('eliminated_entries', models.PositiveIntegerField(default=0)),
+                ('picks_made', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pool', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='pool.pool')),
+                ('week', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pool.week')),
+            ],
+            options={
+                'verbose_name_plural': 'Pool summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pool', '0008_poolsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('pick_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_snapshots', to='pool.pool')),
+                ('week', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_snapshots', to='pool.week')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='picksnapshot',
+            constraint=models.UniqueConstraint(fields=('pool', 'week'), name='unique_pick_snapshot_per_pool_week'),
+        ),
+    ]
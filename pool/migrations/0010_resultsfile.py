@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pool', '0009_picksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultsFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('checksum', models.CharField(max_length=64, unique=True)),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('eliminated', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+                ('week', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pool.week')),
+            ],
+            options={
+                'ordering': ['-processed_at'],
+            },
+        ),
+    ]
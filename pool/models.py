@@ -1,9 +1,19 @@
-from django.db import models
+import json
+import zlib
+
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.admin.options import ModelAdmin
-from django.db.models import UniqueConstraint
+from django.db.models import UniqueConstraint, Count, F, Q
+
+from . import rules
+from .db import serialized_write
+
+
+# Keys per statement when bumping cache versions, well under SQLite's bound parameter limit
+CACHE_VERSION_BATCH = 500
 
 
 class Team(models.Model):
@@ -68,6 +78,34 @@ class Week(models.Model):
     def is_future(self):
         """Check if this week is in the future"""
         return self.start_date > timezone.now()
+    
+    @classmethod
+    def get_current(cls):
+        """Get the week in progress, or the next upcoming week if we're between weeks"""
+        now = timezone.now()
+        current_week = cls.objects.filter(start_date__lte=now, end_date__gte=now).first()
+        if not current_week:
+            current_week = cls.objects.filter(start_date__gt=now).order_by('start_date').first()
+        return current_week
+    
+    @classmethod
+    def missed_pick_weeks(cls):
+        """
+        Weeks that haven't ended whose deadline has passed, where entries
+        without a pick are being eliminated (see pool.rules.missed_pick_weeks)
+        """
+        now = timezone.now()
+        weeks = list(cls.objects.filter(end_date__gte=now).order_by('number'))
+        return [weeks[index] for index in rules.missed_pick_weeks([(week.deadline, week.end_date) for week in weeks], now)]
+    
+    @classmethod
+    async def aget_current(cls):
+        """Async version of get_current for async views"""
+        now = timezone.now()
+        current_week = await cls.objects.filter(start_date__lte=now, end_date__gte=now).afirst()
+        if not current_week:
+            current_week = await cls.objects.filter(start_date__gt=now).order_by('start_date').afirst()
+        return current_week
 
 
 class PoolWeekSettings(models.Model):
@@ -117,40 +155,50 @@ class Pool(models.Model):
     
     def process_missing_picks_eliminations(self):
         """Automatically eliminate entries that didn't make a pick by the deadline"""
-        now = timezone.now()
-        
         # Find weeks where deadline has passed but we're still within the week's timeframe
-        active_weeks = Week.objects.filter(
-            deadline__lt=now,
-            end_date__gte=now
-        )
+        active_weeks = Week.missed_pick_weeks()
         
         eliminated_count = 0
         
         for week in active_weeks:
-            # Get alive entries for this pool
-            alive_entries = self.entries.filter(is_alive=True)
+            # Alive entries in this pool with no pick for this week - one query per week
+            missing = list(self.entries.filter(is_alive=True).exclude(picks__week=week))
+            if not missing:
+                continue
             
-            for entry in alive_entries:
-                # Check if this entry has a pick for this week
-                has_pick = Pick.objects.filter(entry=entry, week=week).exists()
+            # No pick was made before deadline - eliminate the entries
+            with transaction.atomic():
+                Entry.objects.filter(pk__in=[entry.pk for entry in missing]).update(
+                    is_alive=False, eliminated_in_week=week
+                )
                 
-                if not has_pick:
-                    # No pick was made before deadline - eliminate the entry
-                    entry.is_alive = False
-                    entry.eliminated_in_week = week
-                    entry.save()
-                    
-                    # Log the elimination
-                    AuditLog.create(
+                # Log the eliminations
+                AuditLog.objects.bulk_create([
+                    AuditLog(
                         user=None,
                         action="Auto-Eliminated",
                         entry=entry,
                         week=week,
                         details="Automatically eliminated due to no pick by deadline"
                     )
-                    
-                    eliminated_count += 1
+                    for entry in missing
+                ])
+                
+                # Push the eliminations to anyone watching the pool live
+                from .live import publish_eliminations
+                publish_eliminations(week, missing, 'no_pick')
+            
+            eliminated_count += len(missing)
+        
+        if eliminated_count:
+            # The bulk update skips the Entry signals, so refresh the counters here
+            from .dashboard import invalidate_home_dashboard
+            from .timeline import invalidate_entry_timeline
+            from .pages import invalidate_pool_pages
+            PoolSummary.refresh(self.id)
+            invalidate_home_dashboard(*self.entries.values_list('user_id', flat=True))
+            invalidate_entry_timeline(*self.entries.filter(is_alive=False).values_list('id', flat=True))
+            invalidate_pool_pages(self.id)
         
         return eliminated_count
 
@@ -250,6 +298,8 @@ class Pick(models.Model):
         ],
         default='pending'
     )
+    # Idempotency key of the form submission that last wrote this pick
+    submission_key = models.CharField(max_length=64, blank=True, default='')
     
     class Meta:
         # No rank field needed - we'll store two rows for double-pick weeks
@@ -326,10 +376,13 @@ class Pick(models.Model):
         if not week_settings:
             raise ValidationError("Week settings not found for this pool")
         
-        # Check if team was already used by this entry (unless reset_pool)
-        if not self.week.reset_pool:
-            used_teams = self.entry.get_used_teams()
-            if self.team in used_teams and not self.pk:  # Allow editing existing pick
+        # Check if team was already used by this entry in another week (unless reset_pool).
+        # The entry's own pick for this week doesn't count, since it is the one being replaced.
+        if not self.week.reset_pool and not self.pk:  # Allow editing existing pick
+            used_elsewhere = Pick.objects.filter(
+                entry=self.entry, team=self.team
+            ).exclude(week=self.week).exists()
+            if used_elsewhere:
                 raise ValidationError(f"You have already used {self.team} in a previous week")
         
         # Check if this is a double-pick week
@@ -347,13 +400,28 @@ class Pick(models.Model):
             # This validation step is no longer needed as we delete any existing picks when saving a new one
             pass
     
+    def uses_up_team(self, week, past_deadline):
+        """
+        Whether this pick makes its team unavailable for week, following
+        Entry.get_available_teams. Expects the pick's week to be loaded.
+        """
+        if week is None:
+            return True
+        if week.reset_pool:
+            return False
+        # Before the deadline the current week's own pick doesn't count, so it can't be deduced
+        return past_deadline or self.week.number < week.number
+    
     def save(self, *args, **kwargs):
         # Check if this is a superadmin or admin save
         is_superadmin = kwargs.pop('is_superadmin', False)
         admin_request = kwargs.pop('admin_request', False)
+        # Callers that already ran the pick rules (e.g. pool.picks) can skip them here
+        validated = kwargs.pop('validated', False)
         
         # Pass the flags to clean
-        self.clean(is_superadmin=is_superadmin, admin_request=admin_request)
+        if not validated:
+            self.clean(is_superadmin=is_superadmin, admin_request=admin_request)
         
         # Save the model
         super().save(*args, **kwargs)
@@ -395,75 +463,10 @@ class WeeklyResult(models.Model):
         # Save the result
         super().save(*args, **kwargs)
         
-        # Update all picks for this team and week
-        from django.db import transaction
-        from django.db.models import Count, Q
+        # Update all picks for this team and week and eliminate the entries it knocks out
+        from .results import apply_week_results
         
-        with transaction.atomic():
-            # Find all picks for this team and week
-            picks = Pick.objects.filter(team=self.team, week=self.week)
-            
-            # Update each pick's result
-            for pick in picks:
-                pick.result = self.result
-                # Pass admin_request flag to bypass deadline validation
-                pick.save(update_fields=['result'], admin_request=True)
-                
-                # Get the pool settings to check if this is a double-pick week
-                pool = pick.entry.pool
-                week_settings = PoolWeekSettings.objects.filter(
-                    pool=pool,
-                    week=self.week
-                ).first()
-                
-                is_double_pick = week_settings and week_settings.is_double
-                
-                if is_double_pick:
-                    # For double-pick weeks, we need special handling
-                    # Only process eliminations if both picks have results
-                    entry_picks = Pick.objects.filter(entry=pick.entry, week=self.week)
-                    
-                    # Skip if we don't have both picks with results yet
-                    if entry_picks.count() < 2 or entry_picks.filter(result='pending').exists():
-                        continue
-                    
-                    # Count wins for this entry
-                    win_count = entry_picks.filter(result='win').count()
-                    
-                    # In double-pick weeks, you need BOTH picks to win (win_count=2)
-                    # Any entry with 0 or 1 wins gets eliminated
-                    if win_count < 2:
-                        # If either pick lost or tied, eliminate immediately
-                        if pick.entry.is_alive:
-                            pick.entry.is_alive = False
-                            pick.entry.eliminated_in_week = self.week
-                            pick.entry.save(update_fields=['is_alive', 'eliminated_in_week'])
-                            
-                            # Log the elimination
-                            AuditLog.create(
-                                user=None,  # System action
-                                action="ENTRY_ELIMINATED",
-                                entry=pick.entry,
-                                week=self.week,
-                                details=f"{pick.entry.entry_name} was eliminated in Week {self.week.number} - only had {win_count} win(s) in double-pick week"
-                            )
-                else:
-                    # Normal elimination for single-pick weeks
-                    if self.result == 'loss' or self.result == 'tie':
-                        entry = pick.entry
-                        if entry.is_alive:
-                            entry.is_alive = False
-                            entry.eliminated_in_week = self.week
-                            entry.save(update_fields=['is_alive', 'eliminated_in_week'])
-                            
-                            # Log the elimination
-                            AuditLog.create(
-                                user=None,  # System action
-                                action="ENTRY_ELIMINATED",
-                                entry=entry,
-                                week=self.week,
-                                details=f"{entry.entry_name} was eliminated in Week {self.week.number} for picking {self.team}, which {self.get_result_display().lower()}"
-                            )
+        apply_week_results(self.week, {self.team_id: self.result})
 
 
 class AuditLog(models.Model):
@@ -493,3 +496,197 @@ class AuditLog(models.Model):
             week=week,
             details=details
         )
+
+
+class PoolSummary(models.Model):
+    """
+    Materialized entry counts for a pool, so pages don't have to COUNT(*) the
+    entries every time they show them. Kept up to date by the pick and
+    elimination paths (see pool.signals); rebuilt on read if it's missing
+    or was built for a different week.
+    """
+    pool = models.OneToOneField(Pool, on_delete=models.CASCADE, related_name='summary')
+    week = models.ForeignKey(Week, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Week picks_made counts
+    total_entries = models.PositiveIntegerField(default=0)
+    alive_entries = models.PositiveIntegerField(default=0)
+    eliminated_entries = models.PositiveIntegerField(default=0)
+    picks_made = models.PositiveIntegerField(default=0)  # Entries with a pick for the week
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Pool summaries'
+    
+    def __str__(self):
+        return f"{self.pool_id}: {self.alive_entries}/{self.total_entries} alive"
+    
+    @classmethod
+    def refresh(cls, pool_id, week=None):
+        """Recount a pool's entries with one aggregate query and store the result"""
+        if week is None:
+            week = Week.get_current()
+        
+        aggregates = {
+            'total': Count('id', distinct=True),
+            'alive': Count('id', filter=Q(is_alive=True), distinct=True),
+        }
+        if week:
+            aggregates['picked'] = Count('id', filter=Q(picks__week=week), distinct=True)
+        
+        # Page reads rebuild this too, so concurrent refreshes queue for the SQLite write lock.
+        # Counting inside the lock keeps a write that lands in between from being overwritten
+        # with stale counts.
+        with serialized_write():
+            counts = Entry.objects.filter(pool_id=pool_id).aggregate(**aggregates)
+            summary, _ = cls.objects.update_or_create(
+                pool_id=pool_id,
+                defaults={
+                    'week': week,
+                    'total_entries': counts['total'],
+                    'alive_entries': counts['alive'],
+                    'eliminated_entries': counts['total'] - counts['alive'],
+                    'picks_made': counts.get('picked', 0),
+                }
+            )
+        return summary
+    
+    @classmethod
+    def for_pool(cls, pool_id, week=None):
+        """Get the pool's summary, rebuilding it if it's missing or belongs to another week"""
+        if week is None:
+            week = Week.get_current()
+        
+        summary = cls.objects.filter(pool_id=pool_id).first()
+        if summary is None or summary.week_id != (week.id if week else None):
+            summary = cls.refresh(pool_id, week)
+        return summary
+
+
+class PickSnapshot(models.Model):
+    """
+    The pick board for one pool and week, frozen once the deadline has passed.
+
+    After the deadline picks only change through admin edits, so read paths
+    (week picks, standings, reports) decode this row instead of joining Pick
+    to Entry and Team. The payload is zlib-compressed JSON:
+    {"double": bool, "picks": [[entry_id, team_id, result], ...]}.
+    Pick changes for the week delete the row and the next read rebuilds it.
+    """
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='pick_snapshots')
+    week = models.ForeignKey(Week, on_delete=models.CASCADE, related_name='pick_snapshots')
+    data = models.BinaryField()
+    pick_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['pool', 'week'],
+                name='unique_pick_snapshot_per_pool_week'
+            )
+        ]
+    
+    def __str__(self):
+        return f"Pool {self.pool_id} - Week {self.week.number} snapshot ({self.pick_count} picks)"
+    
+    @classmethod
+    def capture(cls, pool_id, week):
+        """Read the week's picks for the pool with one query and store them compressed"""
+        picks = list(
+            Pick.objects.filter(entry__pool_id=pool_id, week=week)
+            .order_by('entry_id', 'id')
+            .values_list('entry_id', 'team_id', 'result')
+        )
+        is_double = PoolWeekSettings.objects.filter(pool_id=pool_id, week=week, is_double=True).exists()
+        payload = json.dumps({'double': is_double, 'picks': picks}, separators=(',', ':'))
+        
+        # Taken lazily by page reads, so concurrent captures queue for the SQLite write lock
+        with serialized_write():
+            snapshot, _ = cls.objects.update_or_create(
+                pool_id=pool_id,
+                week=week,
+                defaults={
+                    'data': zlib.compress(payload.encode('utf-8')),
+                    'pick_count': len(picks),
+                }
+            )
+        return snapshot
+    
+    @classmethod
+    def for_week(cls, pool_id, week):
+        """
+        Get the snapshot for a week whose deadline has passed, taking it if it
+        doesn't exist yet. Returns None before the deadline.
+        """
+        if not week.is_past_deadline():
+            return None
+        snapshot = cls.objects.filter(pool_id=pool_id, week=week).first()
+        if snapshot is None:
+            snapshot = cls.capture(pool_id, week)
+        return snapshot
+    
+    @classmethod
+    def invalidate(cls, week_id, entry_id=None, pool_id=None):
+        """Drop the snapshot a changed pick belongs to; the next read rebuilds it"""
+        snapshots = cls.objects.filter(week_id=week_id)
+        if pool_id is not None:
+            snapshots = snapshots.filter(pool_id=pool_id)
+        else:
+            snapshots = snapshots.filter(pool__entries__id=entry_id)
+        snapshots.delete()
+    
+    def load(self):
+        """Decode the payload"""
+        return json.loads(zlib.decompress(bytes(self.data)).decode('utf-8'))
+
+
+class ResultsFile(models.Model):
+    """
+    Ledger of result drop files applied by the watch_results command. Files are
+    keyed by a checksum of their contents, so a file is never applied twice,
+    even if it's renamed or the watcher restarts. Files that fail to parse are
+    recorded with the error and skipped until their contents change.
+    """
+    name = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64, unique=True)  # SHA-256 of the contents
+    week = models.ForeignKey(Week, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    games = models.PositiveIntegerField(default=0)
+    eliminated = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-processed_at']
+    
+    def __str__(self):
+        return f"{self.name} ({'failed' if self.error else f'{self.games} games'})"
+
+
+class CacheVersion(models.Model):
+    """
+    Version counters for cached pages and their ETags (see pool.pages and
+    pool.timeline). The version is part of every cache key, so bumping it
+    retires everything cached under the old one. The counters live in the
+    database rather than the cache so that a bump made by any process - a
+    results command, another worker - is seen by all of them as soon as it
+    commits, whatever the cache backend.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+    
+    @classmethod
+    def current(cls, *keys):
+        """The versions of keys, in order, read with one query; 0 for keys never bumped"""
+        versions = dict(cls.objects.filter(key__in=keys).values_list('key', 'version'))
+        return tuple(versions.get(key, 0) for key in keys)
+    
+    @classmethod
+    def bump(cls, keys):
+        """Move each key on to a new version, creating the rows that don't exist yet"""
+        keys = sorted(set(keys))
+        for start in range(0, len(keys), CACHE_VERSION_BATCH):
+            batch = keys[start:start + CACHE_VERSION_BATCH]
+            cls.objects.bulk_create([cls(key=key) for key in batch], ignore_conflicts=True)
+            cls.objects.filter(key__in=batch).update(version=F('version') + 1)
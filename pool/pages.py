@@ -0,0 +1,214 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from .checks import cache_is_shared
+from .models import CacheVersion, Pool, Week, Entry, PoolSummary
+from .snapshots import get_week_board, load_board_lookups
+from .singleflight import single_flight
+
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(pool_id):
+    return f"pool-pages-version:{pool_id}"
+
+
+def _picks_version_key(pool_id):
+    return f"pool-picks-version:{pool_id}"
+
+
+def pool_pages_version(pool_id):
+    """The pool's page cache version; it changes whenever an entry or a post-deadline pick does"""
+    return CacheVersion.current(_version_key(pool_id))[0]
+
+
+def pool_versions(pool_id):
+    """
+    The pool's page version and its picks version, read together. The picks
+    version also changes whenever a pick is made or changed before the deadline.
+    """
+    return CacheVersion.current(_version_key(pool_id), _picks_version_key(pool_id))
+
+
+def _page_key(pool_id, name, *parts):
+    version = pool_pages_version(pool_id)
+    return ":".join(str(part) for part in ("pool-pages", pool_id, version, name) + parts)
+
+
+# The standings tabs, in page order; each one is cached and served on its own
+STANDINGS_TABS = ('alive', 'eliminated', 'current_distribution', 'previous_distribution')
+
+
+def get_standings_tab(pool, week, tab):
+    """
+    The data for one standings tab. It is the same for every viewer, so the
+    standings page and its tab fragments share one cached copy per tab.
+
+    Cached per pool until an entry or a post-deadline pick changes (see
+    invalidate_pool_pages) or the week or its deadline state moves on, and
+    rebuilt by one request at a time (see single_flight).
+    """
+    past_deadline = week.is_past_deadline() if week else False
+    key = _page_key(pool.id, "standings", tab, week.id if week else 0, int(past_deadline))
+    return single_flight(key, lambda: build_standings_tab(pool, week, tab), settings.POOL_PAGES_CACHE_TIMEOUT)
+
+
+def build_standings_tab(pool, week, tab):
+    """Build one tab's data, reading post-deadline weeks from their snapshots"""
+    if tab == 'alive':
+        return {'alive_entries': list(Entry.objects.filter(pool=pool, is_alive=True))}
+
+    if tab == 'eliminated':
+        return _build_eliminated_tab(pool)
+
+    if tab == 'current_distribution':
+        board = get_week_board(pool.id, week) if week else None
+        return {'teams_with_counts': _pick_distribution(pool, week, board) if board else None}
+
+    if tab == 'previous_distribution':
+        previous_week = get_previous_week(week)
+        board = get_week_board(pool.id, previous_week) if previous_week else None
+        return {'previous_teams_with_counts': _pick_distribution(pool, previous_week, board) if board else None}
+
+    raise ValueError(f"Unknown standings tab: {tab}")
+
+
+def get_previous_week(week):
+    if week is None or week.number <= 1:
+        return None
+    return Week.objects.filter(number=week.number - 1).first()
+
+
+def _build_eliminated_tab(pool):
+    """Eliminated entries, each with its picks from the week it went out"""
+    eliminated_entries = list(
+        Entry.objects.filter(pool=pool, is_alive=False).select_related('eliminated_in_week')
+    )
+
+    # Picks from each eliminated entry's elimination week, read from that week's snapshot
+    elimination_picks = {}
+    boards_by_week = {}
+    lookups = None
+    for entry in eliminated_entries:
+        elimination_week = entry.eliminated_in_week
+        if elimination_week is None:
+            continue
+        if elimination_week.id not in boards_by_week:
+            # The lookups are shared between every board read here
+            lookups = lookups or load_board_lookups(pool.id)
+            board = get_week_board(pool.id, elimination_week, lookups)
+            boards_by_week[elimination_week.id] = board.picks_by_entry() if board else None
+        picks_by_entry = boards_by_week[elimination_week.id]
+        if picks_by_entry is None:
+            # Eliminated before the deadline (admin action) - there's no snapshot yet
+            elimination_picks[entry.id] = list(entry.get_all_picks_in_elimination_week())
+        else:
+            elimination_picks[entry.id] = picks_by_entry.get(entry.id, [])
+
+    return {
+        'eliminated_entries': eliminated_entries,
+        'elimination_picks': elimination_picks,
+    }
+
+
+def _pick_distribution(pool, week, board):
+    """
+    Team distribution for a post-deadline week from its snapshot, with a
+    "No Pick" row for eligible entries that didn't pick.
+    """
+    teams_with_counts = board.team_counts()
+
+    # Only include entries that were alive during that week:
+    # entries still alive now, and entries eliminated in that week.
+    # Entries eliminated in later weeks would have had picks in this week.
+    eligible_entries = Entry.objects.filter(pool=pool).filter(
+        Q(is_alive=True) | Q(eliminated_in_week=week)
+    ).count()
+
+    no_pick_count = eligible_entries - board.entries_with_picks()
+    if no_pick_count > 0:
+        teams_with_counts.append({
+            'team': None,  # No team selected
+            'count': no_pick_count,
+            'is_no_pick': True  # Flag to identify this as No Pick in template
+        })
+
+    return teams_with_counts
+
+
+def get_week_picks_payload(pool, week):
+    """
+    Every pick for a week whose deadline has passed, with the team distribution.
+    Returns None before the deadline.
+    """
+    if not week.is_past_deadline():
+        return None
+    key = _page_key(pool.id, "week-picks", week.id)
+    return single_flight(key, lambda: build_week_picks_payload(pool, week), settings.POOL_PAGES_CACHE_TIMEOUT)
+
+
+def build_week_picks_payload(pool, week):
+    """Decode the week's snapshot into what week_picks renders"""
+    board = get_week_board(pool.id, week)
+    return {
+        'picks': board.picks,
+        'teams_with_counts': board.team_counts(),
+        'is_double_pick': board.is_double,
+    }
+
+
+def invalidate_pool_pages(*pool_ids):
+    """Retire every cached page payload for these pools by bumping their version"""
+    CacheVersion.bump([key(pool_id) for pool_id in pool_ids for key in (_version_key, _picks_version_key)])
+
+
+def invalidate_pool_picks(*pool_ids):
+    """
+    Note that picks changed before the deadline. The shared payloads don't
+    show those, but each user's own picks on the standings page do.
+    """
+    CacheVersion.bump([_picks_version_key(pool_id) for pool_id in pool_ids])
+
+
+def warm_pool_pages(week=None):
+    """
+    Build and cache the standings, week picks and pool summary for every
+    active pool, so the rush of visitors right after a deadline or a results
+    update doesn't all land on cold caches at once.
+
+    week is the week that just locked or got results; the standings are
+    always warmed for the current week. Returns a list of (pool, seconds).
+
+    With a process-local cache (see pool.checks) only the missed-pick
+    eliminations and the summaries run: the payloads would land in this
+    process's cache, which the web workers never read.
+    """
+    current_week = Week.get_current()
+    weeks = [w for w in {week, current_week} if w is not None and w.is_past_deadline()]
+    shared = cache_is_shared()
+    if not shared:
+        logger.info("Not warming pool page payloads: the cache is local to this process")
+
+    timings = []
+    for pool in Pool.objects.filter(is_active=True):
+        started = time.perf_counter()
+
+        # Eliminate entries that missed the deadline first so the payloads include them
+        pool.process_missing_picks_eliminations()
+        PoolSummary.refresh(pool.id, current_week)
+        if not shared:
+            continue
+        for tab in STANDINGS_TABS:
+            get_standings_tab(pool, current_week, tab)
+        for pick_week in weeks:
+            get_week_picks_payload(pool, pick_week)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Warmed pages for {pool.name} (pool {pool.id}) in {elapsed * 1000:.1f} ms")
+        timings.append((pool, elapsed))
+
+    return timings
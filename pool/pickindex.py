@@ -0,0 +1,37 @@
+from django.db.models import Q
+
+from .models import Pick
+
+
+def build_week_pick_index(week, team_ids=None, pool_ids=None):
+    """
+    Map each team to the entries that picked it this week, as a dict of
+    team id -> [(entry_id, pool_id, user_id, team_ids)], where team_ids is
+    every team the entry picked for the week in pick order.
+
+    team_ids and pool_ids narrow it to the entries holding one of those
+    teams, or in one of those pools; with neither, every entry is included.
+    Applying game results reads the affected entries from here, and a
+    double pick's other half is judged from its team's result.
+
+    It is built from one Pick query on every call, inside the caller's
+    transaction, rather than cached: which entries a result eliminates must
+    never depend on a copy of the picks another process may have changed
+    since.
+    """
+    picks = Pick.objects.filter(week=week)
+    if team_ids is not None or pool_ids is not None:
+        holding = Pick.objects.filter(week=week, team_id__in=list(team_ids or ())).values('entry_id')
+        picks = picks.filter(Q(entry_id__in=holding) | Q(entry__pool_id__in=list(pool_ids or ())))
+    picks = picks.order_by('id').values_list('entry_id', 'entry__pool_id', 'entry__user_id', 'team_id')
+
+    picks_by_entry = {}
+    for entry_id, pool_id, user_id, team_id in picks:
+        picks_by_entry.setdefault(entry_id, (pool_id, user_id, []))[2].append(team_id)
+
+    index = {}
+    for entry_id, (pool_id, user_id, team_ids) in picks_by_entry.items():
+        item = (entry_id, pool_id, user_id, tuple(team_ids))
+        for team_id in team_ids:
+            index.setdefault(team_id, []).append(item)
+    return index
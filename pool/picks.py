@@ -0,0 +1,231 @@
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .dashboard import invalidate_home_dashboard
+from .db import after_write, serialized_write
+from .timeline import invalidate_entry_timeline
+from .pages import invalidate_pool_picks
+from .models import Entry, Pick, PoolWeekSettings, PoolSummary, AuditLog
+from .tasks import send_pick_confirmation_email
+
+
+def new_submission_key():
+    """
+    Fresh idempotency key for a rendered pick form: the time it was issued in
+    hex, so keys sort in the order their forms were loaded, and a random part.
+    """
+    return f"{time.time_ns():016x}-{uuid.uuid4().hex}"
+
+
+def _issued_at(submission_key):
+    """When a key from new_submission_key was issued, or None for a blank or older-style key"""
+    issued, _, random_part = submission_key.partition('-')
+    if not random_part:
+        return None
+    try:
+        return int(issued, 16)
+    except ValueError:
+        return None
+
+
+def save_entry_picks(entry, week, teams, user=None, submission_key=''):
+    """
+    Set an entry's pick(s) for a week in a single transaction.
+
+    The entry row is locked for the duration so double-clicks and retries for the
+    same (entry, week) run one after another. Existing Pick rows are updated in
+    place rather than deleted and re-created, so pick IDs stay stable and the
+    confirmation email only goes out for genuinely new picks.
+
+    Every change stamps the entry's picks for the week with its submission_key.
+    Resubmitting the teams already stored writes nothing, so a double-click or a
+    retry of a submission that succeeded is a no-op. A key issued before the
+    stored one comes from a form loaded before the last change; if its teams
+    differ it is rejected with a ValidationError instead of reverting that
+    change. The stored key with other teams (the back button) is the latest
+    form, and is applied.
+
+    Returns a tuple of (picks, changed).
+    """
+    results = apply_pick_assignments(week, {entry: teams}, user=user, submission_key=submission_key)
+    return results[entry.id]
+
+
+def apply_pick_assignments(week, assignments, user=None, submission_key='', via=None):
+    """
+    Apply the submitted teams for several entries at once, writing only the
+    entries whose picks actually changed.
+
+    assignments maps each Entry to the list of teams it should have for the week.
+    Unchanged entries cost nothing beyond the initial read; changed picks are
+    written with one bulk update, one bulk insert and one bulk delete, and each
+    changed entry gets a single audit row. via (e.g. "Quick Pick") is added to
+    the audit text for multi-entry forms.
+
+    Returns a dict of entry id -> (picks, changed).
+    """
+    assignments = {entry: list(teams) for entry, teams in assignments.items()}
+    entry_ids = [entry.id for entry in assignments]
+    results = {}
+
+    with serialized_write():
+        # Lock the entries; picks for the week may not exist yet so they can't be the lock anchor
+        locked_entries = Entry.objects.select_for_update().filter(pk__in=entry_ids).in_bulk()
+        if any(not locked_entries[entry_id].is_alive for entry_id in entry_ids):
+            raise ValidationError("This entry has been eliminated and cannot make picks")
+        if week.is_past_deadline():
+            raise ValidationError("Cannot make or change picks after the deadline")
+
+        existing_by_entry = {entry_id: [] for entry_id in entry_ids}
+        for pick in Pick.objects.filter(entry_id__in=entry_ids, week=week).select_related('team').order_by('id'):
+            existing_by_entry[pick.entry_id].append(pick)
+
+        now = timezone.now()
+        to_update = []
+        to_create = []
+        to_delete = []
+        audit_logs = []
+
+        for entry, teams in assignments.items():
+            existing_picks = existing_by_entry[entry.id]
+            new_team_ids = {team.id for team in teams}
+
+            old_teams = [pick.team for pick in existing_picks]
+            same_teams = {team.id for team in old_teams} == new_team_ids and len(existing_picks) == len(teams)
+
+            # Nothing to write: the same submission seen again (double-click or retry) or a
+            # resubmission of the current picks
+            if same_teams:
+                results[entry.id] = (existing_picks, False)
+                continue
+
+            # A form loaded before the picks last changed would silently undo that change
+            submitted_at = _issued_at(submission_key)
+            stored_at = max((_issued_at(pick.submission_key) or 0 for pick in existing_picks), default=0)
+            if submitted_at is not None and submitted_at < stored_at:
+                raise ValidationError(
+                    f"The picks for {entry.entry_name} changed after this form was loaded. "
+                    "Reload the page to see them before changing them again."
+                )
+
+            # Keep picks whose team is still selected, and reuse the other rows for the new teams
+            kept = [pick for pick in existing_picks if pick.team_id in new_team_ids]
+            kept_team_ids = {pick.team_id for pick in kept}
+            reusable = [pick for pick in existing_picks if pick.team_id not in new_team_ids]
+            unassigned_teams = [team for team in teams if team.id not in kept_team_ids]
+
+            picks = list(kept)
+            for pick in kept:
+                # Stamp the unchanged picks too, so every pick carries the latest key
+                if pick.submission_key != submission_key:
+                    pick.submission_key = submission_key
+                    to_update.append(pick)
+            for pick, team in zip(reusable, unassigned_teams):
+                pick.team = team
+                pick.submission_key = submission_key
+                pick.result = 'pending'
+                pick.updated_at = now
+                to_update.append(pick)
+                picks.append(pick)
+
+            # Fewer teams than before (shouldn't normally happen) - drop the leftover rows
+            to_delete.extend(reusable[len(unassigned_teams):])
+
+            # More teams than before - create the missing rows
+            for team in unassigned_teams[len(reusable):]:
+                pick = Pick(entry=entry, week=week, team=team, submission_key=submission_key)
+                to_create.append(pick)
+                picks.append(pick)
+
+            audit_logs.append(_pick_change_log(user, entry, week, old_teams, teams, via))
+            results[entry.id] = (picks, True)
+
+        if to_delete:
+            Pick.objects.filter(pk__in=[pick.pk for pick in to_delete]).delete()
+        if to_update:
+            Pick.objects.bulk_update(to_update, ['team', 'submission_key', 'result', 'updated_at'])
+        if to_create:
+            Pick.objects.bulk_create(to_create)
+            # bulk_create skips post_save, so send the confirmation emails once the picks are committed
+            # and the write lock is released - mail delivery shouldn't hold up other pick writes
+            after_write(lambda: _send_confirmations(to_create, week))
+        if audit_logs:
+            AuditLog.objects.bulk_create(audit_logs)
+            invalidate_entry_timeline(*(log.entry_id for log in audit_logs))
+            invalidate_pool_picks(*{log.entry.pool_id for log in audit_logs})
+        if to_create or to_delete:
+            # Bulk writes skip the signals that keep the pool counters current
+            for pool_id in {entry.pool_id for entry in assignments}:
+                PoolSummary.refresh(pool_id, week)
+            invalidate_home_dashboard(*{entry.user_id for entry in assignments})
+
+    return results
+
+
+def load_entry_pick_state(entries, week):
+    """
+    Read what the pick forms need for several entries with a single query.
+
+    Returns a dict of entry id -> {'used_team_ids': set, 'current_picks': [Pick]}.
+    used_team_ids follows Entry.get_available_teams: nothing on a reset week,
+    teams from earlier weeks before the deadline, and every picked team after it.
+    """
+    state = {entry.id: {'used_team_ids': set(), 'current_picks': []} for entry in entries}
+    past_deadline = week.is_past_deadline()
+
+    picks = Pick.objects.filter(entry_id__in=state.keys()).select_related('team', 'week').order_by('id')
+    for pick in picks:
+        entry_state = state[pick.entry_id]
+        if pick.week_id == week.id:
+            entry_state['current_picks'].append(pick)
+        if pick.uses_up_team(week, past_deadline):
+            entry_state['used_team_ids'].add(pick.team_id)
+
+    return state
+
+
+def _send_confirmations(picks, week):
+    """Send the pick confirmation email for newly created picks"""
+    double_pools = set(
+        PoolWeekSettings.objects.filter(
+            pool_id__in={pick.entry.pool_id for pick in picks}, week=week, is_double=True
+        ).values_list('pool_id', flat=True)
+    )
+    for pick in picks:
+        send_pick_confirmation_email(pick, pick.entry.pool_id in double_pools)
+
+
+def _pick_change_log(user, entry, week, old_teams, new_teams, via=None):
+    """Build (but don't save) the audit row for a pick submission that changed something"""
+    if via:
+        # Multi-entry forms keep their own wording
+        new_text = ", ".join(team.name for team in new_teams)
+        if old_teams:
+            old_text = ", ".join(team.name for team in old_teams)
+            action = "Changed Pick"
+            details = f"Changed from {old_text} to {new_text} via {via}"
+        else:
+            action = "Made Pick"
+            details = f"Selected {new_text} via {via}"
+    elif len(new_teams) > 1:
+        if old_teams:
+            action = "DOUBLE_PICK_CHANGED"
+            details = (
+                f"{entry.entry_name} changed picks for Week {week.number} from "
+                f"{'/'.join(str(team) for team in old_teams)} to {'/'.join(str(team) for team in new_teams)}"
+            )
+        else:
+            action = "DOUBLE_PICK_CREATED"
+            details = f"{entry.entry_name} picked {' and '.join(str(team) for team in new_teams)} for Week {week.number}"
+    else:
+        if old_teams:
+            action = "PICK_CHANGED"
+            details = f"{entry.entry_name} changed pick for Week {week.number} from {old_teams[0]} to {new_teams[0]}"
+        else:
+            action = "PICK_CREATED"
+            details = f"{entry.entry_name} picked {new_teams[0]} for Week {week.number}"
+
+    return AuditLog(user=user, action=action, entry=entry, week=week, details=details)
@@ -0,0 +1,582 @@
+import csv
+import io
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import rules
+from .dashboard import invalidate_home_dashboard
+from .db import serialized_write
+from .live import publish_eliminations
+from .models import Entry, Pick, PoolWeekSettings, PoolSummary, PickSnapshot, WeeklyResult, AuditLog, Team, Week
+from .pages import invalidate_pool_pages
+from .pickindex import build_week_pick_index
+from .timeline import invalidate_entry_timeline
+
+
+RESULT_LABELS = dict(WeeklyResult._meta.get_field('result').choices)
+
+# Audit actions for eliminations made by the rules, which a later correction may undo
+RULES_ELIMINATION_ACTIONS = ('ENTRY_ELIMINATED', 'ADMIN_PICK_CHANGE_ELIMINATED')
+
+# Accepted column names (CSV header or JSON keys) for each part of a final score
+SCORE_COLUMNS = {
+    'home': ('home', 'home_team'),
+    'away': ('away', 'away_team'),
+    'home_points': ('home_points', 'home_score'),
+    'away_points': ('away_points', 'away_score'),
+}
+
+
+def record_week_results(week, submitted):
+    """
+    Save a batch of game results for a week and apply them in one transaction.
+
+    submitted maps team id -> (result, notes). WeeklyResult rows are written
+    with one bulk insert and one bulk update, then apply_week_results runs
+    once for the whole batch. Returns a dict of team id -> eliminated entries.
+    """
+    with serialized_write():
+        existing = {
+            weekly_result.team_id: weekly_result
+            for weekly_result in WeeklyResult.objects.filter(week=week, team_id__in=submitted)
+        }
+        to_create = []
+        to_update = []
+        for team_id, (result, notes) in submitted.items():
+            weekly_result = existing.get(team_id)
+            if weekly_result is None:
+                to_create.append(WeeklyResult(week=week, team_id=team_id, result=result, notes=notes))
+            elif weekly_result.result != result or weekly_result.notes != notes:
+                weekly_result.result = result
+                weekly_result.notes = notes
+                to_update.append(weekly_result)
+
+        # bulk_create skips WeeklyResult.save, so the picks are updated once below instead of per team
+        WeeklyResult.objects.bulk_create(to_create)
+        WeeklyResult.objects.bulk_update(to_update, ['result', 'notes'])
+
+        return apply_week_results(week, {team_id: result for team_id, (result, notes) in submitted.items()})
+
+
+def apply_week_results(week, results):
+    """
+    Copy team results onto the week's picks and settle the entries they affect.
+
+    results maps team id -> 'win', 'loss' or 'tie'. The entries that picked
+    these teams come from a pick index of just those entries (see
+    pool.pickindex), read inside the transaction, and their picks are judged
+    by each team's WeeklyResult. In double-pick pools one entry's two wins can knock out others, so
+    every entry in those pools is settled, not just the ones holding these
+    teams. The decisions themselves come from pool.rules.
+
+    Returns a dict of team id -> eliminated entries (see settle_week).
+    """
+    if not results:
+        return {}
+
+    with serialized_write():
+        # Everyone holding one of these teams this week, alive or not, sees a result change
+        index = build_week_pick_index(week, team_ids=results)
+        affected = {}
+        for team_id in results:
+            for entry_id, pool_id, user_id, team_ids in index.get(team_id, ()):
+                affected[entry_id] = (pool_id, team_ids)
+
+        now = timezone.now()
+        teams_by_result = defaultdict(list)
+        for team_id, result in results.items():
+            teams_by_result[result].append(team_id)
+        for result, team_ids in teams_by_result.items():
+            Pick.objects.filter(week=week, team_id__in=team_ids).update(result=result, updated_at=now)
+
+        pool_ids = {pool_id for pool_id, team_ids in affected.values()}
+        double_pools = set(
+            PoolWeekSettings.objects.filter(week=week, is_double=True, pool_id__in=pool_ids)
+            .values_list('pool_id', flat=True)
+        )
+
+        # Entries to settle: the affected ones, plus everyone with picks in the double-pick pools
+        picks_by_entry = dict(affected)
+        if double_pools:
+            for items in build_week_pick_index(week, pool_ids=double_pools).values():
+                for entry_id, pool_id, user_id, team_ids in items:
+                    if pool_id in double_pools:
+                        picks_by_entry[entry_id] = (pool_id, team_ids)
+        entries = _entries_going_into(
+            week, Q(pk__in=[entry_id for entry_id in affected]) | Q(pool_id__in=double_pools)
+        )
+
+        week_results = dict(WeeklyResult.objects.filter(week=week).values_list('team_id', 'result'))
+        week_results.update(results)
+        results_by_pool = defaultdict(dict)
+        for entry_id in entries:
+            if entry_id in picks_by_entry:
+                pool_id, team_ids = picks_by_entry[entry_id]
+                results_by_pool[pool_id][entry_id] = [
+                    (team_id, week_results.get(team_id, 'pending')) for team_id in team_ids
+                ]
+
+        eliminated_by_team, revived = settle_week(week, results_by_pool, double_pools, entries)
+
+        # The Pick update skips the Pick signals, so retire what they would have
+        for pool_id in pool_ids:
+            PickSnapshot.invalidate(week.id, pool_id=pool_id)
+        invalidate_pool_pages(*pool_ids)
+        invalidate_entry_timeline(*affected)
+
+    return eliminated_by_team
+
+
+def settle_pools(week, pool_ids, user=None):
+    """
+    Settle every entry with picks in these pools for week, reading the pick
+    results from Pick rows. Used after admins edit pick results directly, so
+    entries the rules no longer eliminate are revived as well.
+
+    Returns (eliminated_by_team, revived) as settle_week does.
+    """
+    pool_ids = set(pool_ids)
+    with serialized_write():
+        entries = _entries_going_into(week, Q(pool_id__in=pool_ids))
+        results_by_pool = defaultdict(dict)
+        picks = (
+            Pick.objects.filter(week=week, entry_id__in=entries)
+            .order_by('id')
+            .values_list('entry__pool_id', 'entry_id', 'team_id', 'result')
+        )
+        for pool_id, entry_id, team_id, result in picks:
+            results_by_pool[pool_id].setdefault(entry_id, []).append((team_id, result))
+
+        double_pools = set(
+            PoolWeekSettings.objects.filter(week=week, is_double=True, pool_id__in=pool_ids)
+            .values_list('pool_id', flat=True)
+        )
+        return settle_week(week, results_by_pool, double_pools, entries, user=user, revive=True)
+
+
+def _entries_going_into(week, condition):
+    """Entries matching condition that were alive going into week, by id"""
+    return (
+        Entry.objects.filter(condition)
+        .filter(Q(is_alive=True) | Q(eliminated_in_week=week))
+        .select_related('pool')
+        .in_bulk()
+    )
+
+
+def settle_week(week, results_by_pool, double_pools, entries, user=None, revive=False):
+    """
+    Bring entries in line with the rules for week.
+
+    results_by_pool maps pool id -> {entry id: [(team id, result), ...]} for
+    the entries to settle, each entry's picks in pick order; entries maps
+    their ids to Entry objects. Alive entries that pool.rules eliminates are
+    eliminated. With revive, entries eliminated this week that the rules no
+    longer eliminate are brought back (results only ever eliminate, but an
+    admin correction can go either way). user is recorded on the audit log.
+
+    Returns (eliminated_by_team, revived): a dict of team id -> eliminated
+    entries, crediting each to its first pick that didn't win, and a list
+    of revived entries.
+    """
+    eliminated_by_team = defaultdict(list)
+    revived = []
+    audit_logs = []
+    credited = {}  # entry id -> (team id, picks)
+    decided = rules.decide_week(
+        {
+            pool_id: {entry_id: [result for team_id, result in picks] for entry_id, picks in picks_by_entry.items()}
+            for pool_id, picks_by_entry in results_by_pool.items()
+        },
+        double_pools,
+        workers=settings.SURVIVAL_WORKERS,
+    )
+    for pool_id, statuses in decided.items():
+        picks_by_entry = results_by_pool[pool_id]
+        for entry_id, status in statuses.items():
+            entry = entries[entry_id]
+            picks = picks_by_entry[entry_id]
+            if status == rules.ELIMINATED and entry.is_alive:
+                # Credit the first loss or tie, else the first pick that didn't win (or, for one win that two wins beat, the winning pick)
+                team_id = next(
+                    (team_id for team_id, result in picks if result in ('loss', 'tie')),
+                    next((team_id for team_id, result in picks if result != 'win'), picks[0][0])
+                )
+                eliminated_by_team[team_id].append(entry)
+                credited[entry_id] = (team_id, picks)
+            elif status != rules.ELIMINATED and not entry.is_alive and revive:
+                revived.append(entry)
+
+    if revived:
+        # Only undo eliminations the rules made; an admin marking an entry eliminated stands
+        by_rules = _eliminated_by_rules(revived)
+        revived = [entry for entry in revived if entry.id in by_rules]
+
+    teams = Team.objects.in_bulk({team_id for team_id, picks in credited.values()}) if credited else {}
+    for team_id, entries_for_team in eliminated_by_team.items():
+        for entry in entries_for_team:
+            picks = credited[entry.id][1]
+            if entry.pool_id in double_pools:
+                wins = sum(1 for picked_team_id, result in picks if result == 'win')
+                details = (
+                    f"{entry.entry_name} was eliminated in Week {week.number} - "
+                    f"only had {wins} win(s) in double-pick week"
+                )
+                if wins == 1:
+                    details += ", and another entry won both picks"
+            else:
+                result = next(result for picked_team_id, result in picks if picked_team_id == team_id)
+                details = (
+                    f"{entry.entry_name} was eliminated in Week {week.number} for picking "
+                    f"{teams[team_id]}, which {RESULT_LABELS.get(result, result).lower()}"
+                )
+            audit_logs.append(AuditLog(
+                user=user,  # None for system actions
+                action="ADMIN_PICK_CHANGE_ELIMINATED" if user else "ENTRY_ELIMINATED",
+                entry=entry,
+                week=week,
+                details=details
+            ))
+    for entry in revived:
+        audit_logs.append(AuditLog(
+            user=user,
+            action="ADMIN_PICK_CHANGE_REVIVED" if user else "ENTRY_REVIVED",
+            entry=entry,
+            week=week,
+            details=f"{entry.entry_name} was revived in Week {week.number} after pick results changed"
+        ))
+
+    eliminated = [entry for entries_for_team in eliminated_by_team.values() for entry in entries_for_team]
+    if eliminated:
+        Entry.objects.filter(pk__in=[entry.pk for entry in eliminated]).update(
+            is_alive=False, eliminated_in_week=week
+        )
+        for entry in eliminated:
+            entry.is_alive = False
+            entry.eliminated_in_week = week
+    if revived:
+        Entry.objects.filter(pk__in=[entry.pk for entry in revived]).update(is_alive=True, eliminated_in_week=None)
+        for entry in revived:
+            entry.is_alive = True
+            entry.eliminated_in_week = None
+    if audit_logs:
+        AuditLog.objects.bulk_create(audit_logs)
+
+        _entries_changed(eliminated + revived)
+
+    # Push the eliminations to anyone watching the pools live
+    for team_id, entries_for_team in eliminated_by_team.items():
+        result = next(result for picked_team_id, result in credited[entries_for_team[0].id][1] if picked_team_id == team_id)
+        publish_eliminations(week, entries_for_team, 'result', team=teams[team_id], result=result)
+
+    return dict(eliminated_by_team), revived
+
+
+def _eliminated_by_rules(entries):
+    """
+    Ids of the eliminated entries whose elimination the rules made, judged by
+    the latest audit action for the entry in its elimination week
+    """
+    latest_actions = {}
+    logs = (
+        AuditLog.objects.filter(entry__in=entries, week_id__in={entry.eliminated_in_week_id for entry in entries})
+        .exclude(action__in=('ADMIN_MODIFIED_PICK', 'ADMIN_DIRECT_EDIT_PICK'))
+        .order_by('timestamp', 'id')
+        .values_list('entry_id', 'week_id', 'action')
+    )
+    for entry_id, week_id, action in logs:
+        latest_actions[(entry_id, week_id)] = action
+    return {
+        entry.id for entry in entries
+        if latest_actions.get((entry.id, entry.eliminated_in_week_id)) in RULES_ELIMINATION_ACTIONS
+    }
+
+
+def _entries_changed(changed):
+    """The bulk writes skip the Entry signals, so refresh what they would have"""
+    pool_ids = {entry.pool_id for entry in changed}
+    for pool_id in pool_ids:
+        PoolSummary.refresh(pool_id)
+    invalidate_pool_pages(*pool_ids)
+    invalidate_entry_timeline(*(entry.id for entry in changed))
+    invalidate_home_dashboard(*(entry.user_id for entry in changed))
+
+
+def recompute_results(first_week, last_week=None, user=None):
+    """
+    Rebuild pick results and entry statuses from WeeklyResult, for first_week
+    through last_week (the rest of the season by default).
+
+    Used after results are corrected or reset. Pick results are synced with
+    sync_pick_results, then the entries alive going into first_week are
+    followed through the weeks by pool.rules, and only the ones whose status
+    comes out different are written, each with a single audit row. A week
+    an entry has no picks for leaves it as it is (missed picks are
+    process_eliminations' job), and eliminations the rules didn't make
+    stand.
+
+    Returns a dict with the number of pick rows changed under 'picks', and
+    lists of entries under 'eliminated', 'revived' and 'moved' (still
+    eliminated, but in a different week).
+    """
+    weeks = Week.objects.filter(number__gte=first_week.number)
+    if last_week is not None:
+        weeks = weeks.filter(number__lte=last_week.number)
+    weeks = list(weeks.order_by('number'))
+
+    with serialized_write():
+        picks_changed = sync_pick_results(weeks)
+
+        # Everyone alive going into the first week, with their picks for every week
+        entries = (
+            Entry.objects.filter(Q(is_alive=True) | Q(eliminated_in_week__number__gte=first_week.number))
+            .select_related('pool', 'eliminated_in_week')
+            .in_bulk()
+        )
+        codes = defaultdict(str)  # (entry id, week id) -> result codes, in pick order
+        for entry_id, week_id, result in (
+            Pick.objects.filter(entry_id__in=entries, week__in=weeks).order_by('id').values_list('entry_id', 'week_id', 'result')
+        ):
+            codes[(entry_id, week_id)] += rules.RESULT_CODES[result]
+        double_weeks = set(
+            PoolWeekSettings.objects.filter(week__in=weeks, is_double=True).values_list('pool_id', 'week_id')
+        )
+
+        eliminated = [entry for entry in entries.values() if not entry.is_alive]
+        by_rules = _eliminated_by_rules(eliminated) if eliminated else set()
+        candidates = defaultdict(list)  # pool id -> entry ids alive going into the first week
+        for entry_id, entry in sorted(entries.items()):
+            if entry.is_alive or entry_id in by_rules:
+                candidates[entry.pool_id].append(entry_id)
+
+        # A week without picks leaves an entry as it is, so no week requires one
+        pools = [
+            (
+                [((pool_id, week.id) in double_weeks, False) for week in weeks],
+                [(tuple(codes[(entry_id, week.id)] for week in weeks), 0) for entry_id in entry_ids],
+            )
+            for pool_id, entry_ids in candidates.items()
+        ]
+        eliminated_in = {}  # entry id -> the week the rules now eliminate it in
+        for entry_ids, outcomes in zip(candidates.values(), rules.replay_pools(pools, workers=settings.SURVIVAL_WORKERS)):
+            for entry_id, outcome in zip(entry_ids, outcomes):
+                if outcome is not None:
+                    eliminated_in[entry_id] = weeks[outcome[0]]
+
+        changes = {'picks': picks_changed, 'eliminated': [], 'revived': [], 'moved': []}
+        corrections = []
+        for entry_id in sorted(entry_id for entry_ids in candidates.values() for entry_id in entry_ids):
+            entry = entries[entry_id]
+            week = eliminated_in.get(entry_id)
+            old_week = entry.eliminated_in_week
+            if week is None and (entry.is_alive or old_week not in weeks):
+                # Still alive, or still going out in a week after the ones recomputed
+                continue
+            if week is not None and old_week == week:
+                continue
+
+            if week is None:
+                changes['revived'].append(entry)
+                action = "ADMIN_PICK_CHANGE_REVIVED" if user else "ENTRY_REVIVED"
+                details = f"{entry.entry_name} was revived in Week {old_week.number} when results were recomputed"
+            else:
+                changes['eliminated' if entry.is_alive else 'moved'].append(entry)
+                action = "ADMIN_PICK_CHANGE_ELIMINATED" if user else "ENTRY_ELIMINATED"
+                details = f"{entry.entry_name} was eliminated in Week {week.number}"
+                if not entry.is_alive:
+                    details += f" instead of Week {old_week.number}"
+                details += " when results were recomputed"
+            corrections.append((entry, week, action, details))
+        write_entry_statuses(corrections, user=user)
+
+    return changes
+
+
+def sync_pick_results(weeks, pool_ids=None):
+    """
+    Copy each team's WeeklyResult onto its picks for weeks, setting picks
+    without one back to 'pending'. Only the rows that differ are touched,
+    with one UPDATE per result value per week, and only in pool_ids when
+    given. Returns how many changed.
+    """
+    results_by_week = defaultdict(dict)
+    for week_id, team_id, result in WeeklyResult.objects.filter(week__in=weeks).values_list('week_id', 'team_id', 'result'):
+        results_by_week[week_id][team_id] = result
+
+    now = timezone.now()
+    picks_changed = 0
+    stale_pools = defaultdict(set)  # week id -> pools whose picks changed
+    stale_entries = set()
+    for week in weeks:
+        picks = Pick.objects.filter(week=week)
+        if pool_ids is not None:
+            picks = picks.filter(entry__pool_id__in=pool_ids)
+        week_results = results_by_week[week.id]
+        teams_by_result = defaultdict(list)
+        for team_id, result in week_results.items():
+            teams_by_result[result].append(team_id)
+
+        # Picks whose result doesn't match their team's WeeklyResult, or that have one without a WeeklyResult
+        stale = ~Q(team_id__in=list(week_results)) & ~Q(result='pending')
+        for result, team_ids in teams_by_result.items():
+            stale |= Q(team_id__in=team_ids) & ~Q(result=result)
+        rows = list(picks.filter(stale).values_list('entry_id', 'entry__pool_id', 'team_id'))
+        if not rows:
+            continue
+
+        stale_teams = {team_id for entry_id, pool_id, team_id in rows}
+        for result, team_ids in teams_by_result.items():
+            if stale_teams.intersection(team_ids):
+                picks.filter(team_id__in=team_ids).exclude(result=result).update(result=result, updated_at=now)
+        if stale_teams - week_results.keys():
+            picks.exclude(team_id__in=list(week_results)).exclude(result='pending').update(result='pending', updated_at=now)
+        picks_changed += len(rows)
+        stale_pools[week.id].update(pool_id for entry_id, pool_id, team_id in rows)
+        stale_entries.update(entry_id for entry_id, pool_id, team_id in rows)
+
+    # The Pick updates skip the Pick signals, so retire what they would have
+    for week_id, week_pools in stale_pools.items():
+        for pool_id in week_pools:
+            PickSnapshot.invalidate(week_id, pool_id=pool_id)
+        invalidate_pool_pages(*week_pools)
+    invalidate_entry_timeline(*stale_entries)
+    return picks_changed
+
+
+def write_entry_statuses(corrections, user=None):
+    """
+    Write a batch of entry status corrections, each with one audit row.
+
+    corrections is a list of (entry, week, action, details), week being the
+    week the entry is now eliminated in, or None to revive it; the audit row
+    for a revival goes on the week it had been eliminated in. Entries are
+    written with one UPDATE per elimination week, plus one for revivals.
+    """
+    if not corrections:
+        return
+
+    audit_logs = []
+    eliminated_by_week = defaultdict(list)
+    revived = []
+    for entry, week, action, details in corrections:
+        audit_logs.append(AuditLog(
+            user=user,
+            action=action,
+            entry=entry,
+            week=week or entry.eliminated_in_week,
+            details=details
+        ))
+        if week is None:
+            revived.append(entry)
+        else:
+            eliminated_by_week[week].append(entry)
+
+    for week, entries in eliminated_by_week.items():
+        Entry.objects.filter(pk__in=[entry.pk for entry in entries]).update(is_alive=False, eliminated_in_week=week)
+        for entry in entries:
+            entry.is_alive = False
+            entry.eliminated_in_week = week
+    if revived:
+        Entry.objects.filter(pk__in=[entry.pk for entry in revived]).update(is_alive=True, eliminated_in_week=None)
+        for entry in revived:
+            entry.is_alive = True
+            entry.eliminated_in_week = None
+
+    AuditLog.objects.bulk_create(audit_logs)
+    _entries_changed([entry for entry, week, action, details in corrections])
+
+
+def preview_week_results(week, submitted):
+    """
+    Run record_week_results and roll it back, returning the entries it would
+    eliminate. Nothing is saved and no live events are sent.
+    """
+    with transaction.atomic():
+        eliminated = record_week_results(week, submitted)
+        transaction.set_rollback(True)
+    return eliminated
+
+
+def parse_scores(content, name=''):
+    """
+    Read final scores from CSV or JSON text.
+
+    CSV needs a header row with home, away, home_points and away_points
+    columns. JSON is a list of objects with the same keys, or an object with
+    the list under "games". JSON is assumed when name ends in .json or the
+    content starts with [ or {.
+
+    Returns a list of (home, away, home_points, away_points) tuples, teams as
+    written in the file. Raises ValueError describing the first bad row.
+    """
+    content = content.lstrip('\ufeff')
+    if name.lower().endswith('.json') or content.lstrip()[:1] in ('[', '{'):
+        try:
+            rows = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get('games')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('JSON must be a list of games, or an object with a "games" list')
+    else:
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+    games = []
+    for number, row in enumerate(rows, start=1):
+        row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+        game = {}
+        for field, columns in SCORE_COLUMNS.items():
+            value = next((row[column] for column in columns if row.get(column) not in (None, '')), None)
+            if value is None:
+                raise ValueError(f"Game {number}: missing {field}")
+            game[field] = str(value).strip()
+        try:
+            home_points = int(game['home_points'])
+            away_points = int(game['away_points'])
+        except ValueError:
+            raise ValueError(f"Game {number}: points must be whole numbers")
+        games.append((game['home'], game['away'], home_points, away_points))
+
+    if not games:
+        raise ValueError('No games found')
+    return games
+
+
+def results_from_scores(games):
+    """
+    Turn final scores into the {team id: (result, notes)} map record_week_results
+    takes. Teams can be given by abbreviation, name or "City Name". Raises
+    ValueError for an unknown team or a team that plays twice.
+    """
+    teams_by_label = {}
+    for team in Team.objects.all():
+        for label in (team.abbreviation, team.name, str(team)):
+            teams_by_label[label.lower()] = team
+
+    submitted = {}
+    for home_label, away_label, home_points, away_points in games:
+        home = teams_by_label.get(home_label.lower())
+        away = teams_by_label.get(away_label.lower())
+        for label, team in ((home_label, home), (away_label, away)):
+            if team is None:
+                raise ValueError(f"Unknown team: {label}")
+            if team.id in submitted:
+                raise ValueError(f"{team} appears in more than one game")
+        if home.id == away.id:
+            raise ValueError(f"{home} can't play itself")
+
+        notes = f"{away.abbreviation} {away_points} @ {home.abbreviation} {home_points}"
+        if home_points == away_points:
+            submitted[home.id] = ('tie', notes)
+            submitted[away.id] = ('tie', notes)
+        else:
+            home_won = home_points > away_points
+            submitted[home.id] = ('win' if home_won else 'loss', notes)
+            submitted[away.id] = ('loss' if home_won else 'win', notes)
+    return submitted
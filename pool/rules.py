@@ -0,0 +1,187 @@
+"""
+Survival rules, as pure functions over plain data.
+
+Every elimination path (recording results, admin pick edits, the what-if
+simulator) loads picks as tuples and asks this module what they mean, so
+the rules live in one place and can be checked without a database. The
+rules are the ones on the rules page:
+
+- Single-pick weeks: a win advances; a loss or tie eliminates.
+- Double-pick weeks: two wins advance. If no entry in the pool gets two
+  wins, entries with one win advance too. No wins eliminates.
+- An entry with no pick for a week is eliminated once the deadline passes,
+  if it existed before the week ended (see missed_pick_weeks).
+
+Pools never affect each other, so decide_week and replay_pools can hand
+pools to worker processes. Workers get single-letter result codes rather
+than models or entry keys, and send back one code per entry.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+ADVANCED = 'advanced'
+ELIMINATED = 'eliminated'
+PENDING = 'pending'  # Depends on games that haven't been played yet
+
+# The compact form handed to worker processes
+RESULT_CODES = {'win': 'W', 'loss': 'L', 'tie': 'T', 'pending': 'P'}
+RESULTS_BY_CODE = {code: result for result, code in RESULT_CODES.items()}
+STATUS_CODES = {ADVANCED: 'A', ELIMINATED: 'E', PENDING: 'P'}
+STATUSES_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+
+# Below this many entries a process pool costs more to start and feed than it saves
+PARALLEL_MIN_ENTRIES = 20000
+
+
+def week_statuses(results_by_entry, is_double):
+    """
+    Decide one pool's week.
+
+    results_by_entry maps each entry (any hashable key) that was alive going
+    into the week to the results of its picks: 'win', 'loss', 'tie' or
+    'pending'. In double-pick weeks every entry that was alive going in
+    should be included, since one entry's two wins decide the others'
+    fate. Returns a dict of entry -> ADVANCED, ELIMINATED or PENDING.
+
+    A decided status never changes as pending results come in (unless a
+    recorded result is corrected), so results can be applied game by game.
+    """
+    if not is_double:
+        statuses = {}
+        for entry, results in results_by_entry.items():
+            if not results or any(result in ('loss', 'tie') for result in results):
+                statuses[entry] = ELIMINATED
+            elif 'pending' in results:
+                statuses[entry] = PENDING
+            else:
+                statuses[entry] = ADVANCED
+        return statuses
+
+    # (wins so far, most wins still possible) per entry; only two picks count
+    tallies = {}
+    for entry, results in results_by_entry.items():
+        wins = results.count('win')
+        possible = wins + results.count('pending')
+        tallies[entry] = (min(wins, 2), min(possible, 2))
+
+    have_two = sum(1 for wins, possible in tallies.values() if wins == 2)
+    can_have_two = sum(1 for wins, possible in tallies.values() if possible == 2)
+
+    statuses = {}
+    for entry, (wins, possible) in tallies.items():
+        others_have_two = have_two - (wins == 2) > 0
+        others_can_have_two = can_have_two - (possible == 2) > 0
+        # Worst case: this entry's pending picks lose and everyone else's win. Best case: the reverse.
+        if wins == 2 or (wins == 1 and not others_can_have_two):
+            statuses[entry] = ADVANCED
+        elif possible == 2 or (possible == 1 and not others_have_two):
+            statuses[entry] = PENDING
+        else:
+            # Can't win at all, or can't reach two wins when someone else already has them
+            statuses[entry] = ELIMINATED
+    return statuses
+
+
+def missed_pick_weeks(weeks, now, created_at=None):
+    """
+    The indexes of weeks, given as (deadline, end_date) pairs in order, where
+    an entry without a pick is eliminated: the deadline has passed, and the
+    entry (created at created_at, if given) existed before the week ended.
+
+    The app enforces this while each week runs, over the weeks that haven't
+    ended (Pool.process_missing_picks_eliminations); verify_pool_state replays
+    it over the whole season.
+    """
+    return [
+        index for index, (deadline, end_date) in enumerate(weeks)
+        if deadline < now and (created_at is None or created_at <= end_date)
+    ]
+
+
+def decide_week(results_by_pool, double_pools, workers=1, min_entries=PARALLEL_MIN_ENTRIES):
+    """
+    week_statuses for every pool in a week.
+
+    results_by_pool maps pool -> {entry: results}, as week_statuses takes;
+    double_pools holds the pools picking two teams. Returns pool ->
+    {entry: status}. With more than one worker and at least min_entries
+    entries, the pools are decided in a process pool.
+    """
+    pools = list(results_by_pool)
+    payloads = [
+        ([''.join(RESULT_CODES[result] for result in results) for results in results_by_pool[pool].values()], pool in double_pools)
+        for pool in pools
+    ]
+    decided = _map_pools(_decide_codes, payloads, [len(codes) for codes, is_double in payloads], workers, min_entries)
+    return {
+        pool: {entry: STATUSES_BY_CODE[code] for entry, code in zip(results_by_pool[pool], codes)}
+        for pool, codes in zip(pools, decided)
+    }
+
+
+def _decide_codes(payload):
+    codes, is_double = payload
+    statuses = week_statuses(
+        {i: [RESULTS_BY_CODE[code] for code in entry_codes] for i, entry_codes in enumerate(codes)},
+        is_double
+    )
+    return ''.join(STATUS_CODES[statuses[i]] for i in range(len(codes)))
+
+
+def replay_pool(pool_weeks, entry_picks):
+    """
+    Follow one pool's entries through its weeks, from compact data.
+
+    pool_weeks lists (is_double, picks_required) for each week in order,
+    picks_required meaning the deadline has passed, so an entry without a
+    pick that week is out. entry_picks lists (codes, first_required) per
+    entry: a string of result codes (see RESULT_CODES) for each week, empty
+    for no picks, and the index of the first week the entry has to pick in.
+    Both come from missed_pick_weeks.
+
+    Returns a list matching entry_picks: None for an entry still in after
+    the last week, or (week index, missed) for the week it went out in,
+    missed meaning it had no pick rather than losing ones.
+    """
+    outcomes = [None] * len(entry_picks)
+    alive = range(len(entry_picks))
+    for week_index, (is_double, picks_required) in enumerate(pool_weeks):
+        results_by_entry = {}
+        for i in alive:
+            codes, first_required = entry_picks[i]
+            if codes[week_index]:
+                results_by_entry[i] = [RESULTS_BY_CODE[code] for code in codes[week_index]]
+            elif picks_required and week_index >= first_required:
+                outcomes[i] = (week_index, True)
+        for i, status in week_statuses(results_by_entry, is_double).items():
+            if status == ELIMINATED:
+                outcomes[i] = (week_index, False)
+        alive = [i for i in alive if outcomes[i] is None]
+    return outcomes
+
+
+def replay_pools(pools, workers=1, min_entries=PARALLEL_MIN_ENTRIES):
+    """
+    replay_pool for a list of (pool_weeks, entry_picks) pairs, returning
+    their outcomes in order. With more than one worker and at least
+    min_entries entries, the pools are replayed in a process pool.
+    """
+    return _map_pools(_replay_payload, pools, [len(entry_picks) for pool_weeks, entry_picks in pools], workers, min_entries)
+
+
+def _replay_payload(payload):
+    return replay_pool(*payload)
+
+
+def _map_pools(function, payloads, sizes, workers, min_entries):
+    """Run function over the per-pool payloads (sizes being their entry counts), in worker processes when it pays"""
+    if workers <= 1 or len(payloads) < 2 or sum(sizes) < min_entries:
+        return [function(payload) for payload in payloads]
+
+    # Largest pools first so one big pool doesn't start last and hold everything up
+    order = sorted(range(len(payloads)), key=lambda i: -sizes[i])
+    with ProcessPoolExecutor(max_workers=min(workers, len(payloads))) as executor:
+        results = list(executor.map(function, [payloads[i] for i in order]))
+    ordered = [None] * len(payloads)
+    for i, result in zip(order, results):
+        ordered[i] = result
+    return ordered
@@ -1,14 +1,14 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.utils import timezone
 from django.db.models import F
 
-from .models import Pick, PoolWeekSettings, Week, Pool
-from .tasks import send_picks_report_email
+from .models import Pick, PoolWeekSettings, Week, Pool, Entry, PoolSummary, PickSnapshot
+from .tasks import send_picks_report_email, send_pick_confirmation_email
+from .dashboard import invalidate_home_dashboard
+from .timeline import invalidate_entry_timeline
+from .snapshots import capture_week_snapshots
+from .pages import invalidate_pool_pages, warm_pool_pages
 
 
 @receiver(post_save, sender=Pick)
@@ -18,9 +18,6 @@ def send_confirmation_email(sender, instance, created, **kwargs):
     This is triggered by the post_save signal on the Pick model.
     """
     if created:  # Only send on creation, not updates
-        # Get the user's email
-        user_email = instance.entry.user.email
-        
         # Get the pool-specific settings for this week
         week_settings = PoolWeekSettings.objects.filter(
             pool=instance.entry.pool,
@@ -32,33 +29,55 @@ def send_confirmation_email(sender, instance, created, **kwargs):
         if week_settings:
             is_double_pick = week_settings.is_double
         
-        # Prepare the email content
-        context = {
-            'user': instance.entry.user,
-            'entry': instance.entry,
-            'pick': instance,
-            'week': instance.week,
-            'team': instance.team,
-            'is_double_pick': is_double_pick,
-        }
-        
-        # Render the HTML email template
-        html_message = render_to_string('pool/email/pick_confirmation.html', context)
-        plain_message = strip_tags(html_message)
-        
-        # Send the email
-        try:
-            send_mail(
-                subject=f'LMS 2025: Week {instance.week.number} Pick Confirmation',
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user_email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-        except Exception as e:
-            # Log the error but don't crash the app
-            print(f"Error sending confirmation email: {e}")
+        send_pick_confirmation_email(instance, is_double_pick)
+
+
+@receiver(post_save, sender=Entry)
+def refresh_pool_summary_for_entry(sender, instance, **kwargs):
+    """
+    Keep the pool's entry counts and the owner's home dashboard current when an
+    entry is added, eliminated or revived.
+    """
+    PoolSummary.refresh(instance.pool_id)
+    invalidate_home_dashboard(instance.user_id)
+    invalidate_entry_timeline(instance.id)
+    invalidate_pool_pages(instance.pool_id)
+
+
+@receiver(post_save, sender=Pick)
+def refresh_pool_summary_for_pick(sender, instance, created, **kwargs):
+    """
+    A new pick changes how many entries have picked this week.
+    Result updates don't change any counts, but do change the entry's timeline.
+    """
+    invalidate_entry_timeline(instance.entry_id)
+    # Admin edits after the deadline change the frozen pick board
+    PickSnapshot.invalidate(instance.week_id, entry_id=instance.entry_id)
+    invalidate_pool_pages(instance.entry.pool_id)
+    if created:
+        PoolSummary.refresh(instance.entry.pool_id)
+        invalidate_home_dashboard(instance.entry.user_id)
+
+
+@receiver(post_delete, sender=Entry)
+@receiver(post_delete, sender=Pick)
+def invalidate_pool_summary(sender, instance, **kwargs):
+    """
+    Drop the summary when entries or picks are deleted; it is rebuilt on the next read.
+    Deletes can be part of a pool being deleted, so nothing is recreated here.
+    """
+    if sender is Entry:
+        PoolSummary.objects.filter(pool_id=instance.pool_id).delete()
+        invalidate_home_dashboard(instance.user_id)
+        invalidate_pool_pages(instance.pool_id)
+    else:
+        invalidate_entry_timeline(instance.entry_id)
+        PickSnapshot.invalidate(instance.week_id, entry_id=instance.entry_id)
+        PoolSummary.objects.filter(pool__entries__id=instance.entry_id).delete()
+        invalidate_pool_pages(*Pool.objects.filter(entries__id=instance.entry_id).values_list('id', flat=True))
+        # The entry may already be gone if it is being deleted too
+        user_ids = Entry.objects.filter(pk=instance.entry_id).values_list('user_id', flat=True)
+        invalidate_home_dashboard(*user_ids)
 
 
 def check_deadlines_and_send_reports():
@@ -74,6 +93,9 @@ def check_deadlines_and_send_reports():
     )
     
     for week in weeks_needing_emails:
+        # Freeze the week's pick boards before the reports read them
+        capture_week_snapshots(week)
+        
         # Get all pools that include this week
         pools = Pool.objects.filter(weeks=week, is_active=True)
         
@@ -85,6 +107,9 @@ def check_deadlines_and_send_reports():
             except Exception as e:
                 print(f"Error sending pick reports for {pool.name}, Week {week.number}: {e}")
         
+        # Pre-build the pool pages everyone opens once picks are revealed
+        warm_pool_pages(week)
+        
         # Mark emails as sent for this week
         week.email_sent = True
         week.save(update_fields=['email_sent'])
@@ -98,6 +123,9 @@ def handle_week_deadline(sender, instance, **kwargs):
     # Check if this week's deadline has passed but emails haven't been sent
     now = timezone.now()
     if instance.deadline <= now and not instance.email_sent:
+        # Freeze the week's pick boards before the reports read them
+        capture_week_snapshots(instance)
+        
         # Get all pools that include this week
         pools = Pool.objects.filter(weeks=instance, is_active=True)
         
@@ -109,6 +137,9 @@ def handle_week_deadline(sender, instance, **kwargs):
             except Exception as e:
                 print(f"Error sending pick reports for {pool.name}, Week {instance.number}: {e}")
         
+        # Pre-build the pool pages everyone opens once picks are revealed
+        warm_pool_pages(instance)
+        
         # Mark emails as sent for this week
         instance.email_sent = True
         instance.save(update_fields=['email_sent'])
@@ -0,0 +1,227 @@
+from collections import defaultdict
+
+from django.db.models import Q
+
+from . import rules
+from .models import Entry, Pick, PoolWeekSettings, WeeklyResult
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Enumerating n undecided teams means 2 ** n outcomes; beyond this the admin
+# panel only offers single scenarios. The pure Python fallback is kept smaller.
+MAX_ENUMERATED_TEAMS = 16 if np is not None else 10
+
+# Outcomes evaluated per NumPy batch, to keep the working arrays small
+ENUMERATION_BATCH = 4096
+
+
+class WeekSimulator:
+    """
+    What-if evaluation of a week's results, in memory.
+
+    The entries that were alive going into the week are loaded once with
+    their picks and grouped by (pool, picked teams), since entries that
+    picked the same teams in the same pool always share a fate. Hypothetical
+    results are then decided by pool.rules, the same kernel the elimination
+    paths use, without touching the database. Entries whose fate still
+    depends on unplayed games count as survivors, as do entries without a
+    pick until the deadline passes.
+    """
+
+    def __init__(self, groups, double_pools=(), known_results=None, past_deadline=True):
+        """
+        groups maps (pool_id, team_ids) to the number of entries that picked
+        exactly those teams; known_results maps team id -> recorded result.
+        """
+        self.groups = dict(groups)
+        self.double_pools = set(double_pools)
+        self.known_results = dict(known_results or {})
+        self.past_deadline = past_deadline
+
+        self.entries_by_pool = defaultdict(int)
+        for (pool_id, team_ids), count in self.groups.items():
+            self.entries_by_pool[pool_id] += count
+        self.pool_ids = sorted(self.entries_by_pool)
+        picked = {team_id for pool_id, team_ids in self.groups for team_id in team_ids}
+        self.pending_teams = sorted(picked - set(self.known_results))
+
+    @classmethod
+    def for_week(cls, week):
+        """Load a week's entries, picks, results and double-pick pools"""
+        known_results = dict(WeeklyResult.objects.filter(week=week).values_list('team_id', 'result'))
+        double_pools = PoolWeekSettings.objects.filter(week=week, is_double=True).values_list('pool_id', flat=True)
+
+        # Alive now, or knocked out by this week's results already recorded
+        entries = Entry.objects.filter(
+            Q(is_alive=True) | Q(eliminated_in_week=week),
+            pool__is_active=True,
+        )
+        teams_by_entry = {entry_id: [] for entry_id in entries.values_list('id', flat=True)}
+        pool_by_entry = dict(entries.values_list('id', 'pool_id'))
+        for entry_id, team_id in Pick.objects.filter(week=week, entry__in=entries).values_list('entry_id', 'team_id'):
+            teams_by_entry[entry_id].append(team_id)
+
+        groups = defaultdict(int)
+        for entry_id, team_ids in teams_by_entry.items():
+            groups[(pool_by_entry[entry_id], tuple(sorted(team_ids)))] += 1
+        return cls(groups, double_pools, known_results, week.is_past_deadline())
+
+    def evaluate(self, results=None):
+        """
+        Survivors per pool if the week's undecided teams finish as results says
+        (team id -> 'win', 'loss' or 'tie'). Recorded results still apply
+        unless results overrides them. Returns a dict of pool id -> survivors.
+        """
+        combined = dict(self.known_results)
+        combined.update(results or {})
+
+        results_by_pool = defaultdict(dict)
+        survivors = {pool_id: 0 for pool_id in self.pool_ids}
+        for (pool_id, team_ids), count in self.groups.items():
+            if not team_ids:
+                # The missing-pick eliminations run at the deadline
+                if not self.past_deadline:
+                    survivors[pool_id] += count
+                continue
+            results_by_pool[pool_id][(pool_id, team_ids)] = [combined.get(team_id, 'pending') for team_id in team_ids]
+
+        for pool_id, results_by_group in results_by_pool.items():
+            statuses = rules.week_statuses(results_by_group, pool_id in self.double_pools)
+            for group, status in statuses.items():
+                if status != rules.ELIMINATED:
+                    survivors[pool_id] += self.groups[group]
+        return survivors
+
+    def if_loses(self):
+        """For each undecided team, the survivors per pool if it loses and every other undecided team wins"""
+        all_win = {team_id: 'win' for team_id in self.pending_teams}
+        return {team_id: self.evaluate({**all_win, team_id: 'loss'}) for team_id in self.pending_teams}
+
+    def enumerate(self, games=()):
+        """
+        Evaluate every combination of wins and losses for the undecided teams.
+
+        games is an optional list of (team_id, team_id) pairs playing each
+        other, so exactly one of them wins; other teams win or lose on their
+        own. Ties are left out. Returns a dict of pool id -> {'min', 'max',
+        'mean', 'wiped_out'} over the outcomes, 'wiped_out' being how many
+        leave the pool with no survivors, plus the number of outcomes under
+        'outcomes'. Raises ValueError when there are more than
+        MAX_ENUMERATED_TEAMS independent results to combine.
+        """
+        # Each unit is one independent win/loss: (team that wins if the bit is set, its opponent or None)
+        pending = set(self.pending_teams)
+        units = []
+        for home, away in games:
+            if home in pending and away in pending:
+                units.append((home, away))
+                pending -= {home, away}
+        units.extend((team_id, None) for team_id in sorted(pending))
+
+        if len(units) > MAX_ENUMERATED_TEAMS:
+            raise ValueError(
+                f"{len(units)} undecided results is too many to enumerate (limit {MAX_ENUMERATED_TEAMS})"
+            )
+
+        if np is not None:
+            counts = self._enumerate_numpy(units)
+        else:
+            counts = self._enumerate_python(units)
+
+        outcomes = 2 ** len(units)
+        summary = {'outcomes': outcomes}
+        for pool_id, pool_counts in counts.items():
+            summary[pool_id] = {
+                'min': pool_counts['min'],
+                'max': pool_counts['max'],
+                'mean': pool_counts['total'] / outcomes,
+                'wiped_out': pool_counts['wiped_out'],
+            }
+        return summary
+
+    def _unit_results(self, units, outcome):
+        results = {}
+        for bit, (winner, loser) in enumerate(units):
+            won = bool(outcome >> bit & 1)
+            results[winner] = 'win' if won else 'loss'
+            if loser is not None:
+                results[loser] = 'loss' if won else 'win'
+        return results
+
+    def _enumerate_python(self, units):
+        counts = {pool_id: {'min': None, 'max': 0, 'total': 0, 'wiped_out': 0} for pool_id in self.pool_ids}
+        for outcome in range(2 ** len(units)):
+            for pool_id, survivors in self.evaluate(self._unit_results(units, outcome)).items():
+                pool_counts = counts[pool_id]
+                pool_counts['min'] = survivors if pool_counts['min'] is None else min(pool_counts['min'], survivors)
+                pool_counts['max'] = max(pool_counts['max'], survivors)
+                pool_counts['total'] += survivors
+                pool_counts['wiped_out'] += survivors == 0
+        return counts
+
+    def _enumerate_numpy(self, units):
+        # Where each undecided team's result comes from: (bit, whether a set bit means it won)
+        team_bits = {}
+        for bit, (winner, loser) in enumerate(units):
+            team_bits[winner] = (bit, True)
+            if loser is not None:
+                team_bits[loser] = (bit, False)
+
+        pool_index = {pool_id: i for i, pool_id in enumerate(self.pool_ids)}
+        groups = list(self.groups.items())
+        # Entries per group, spread across the pool columns, so survivors per pool is one matrix product
+        weights = np.zeros((len(groups), len(self.pool_ids)), dtype=np.int64)
+        for i, ((pool_id, team_ids), count) in enumerate(groups):
+            weights[i, pool_index[pool_id]] = count
+
+        pick_counts = np.array([len(team_ids) for (pool_id, team_ids), count in groups], dtype=np.int64)
+        is_double = np.array([pool_id in self.double_pools for (pool_id, team_ids), count in groups], dtype=bool)
+        no_picks = pick_counts == 0
+        group_pools = np.array([pool_index[pool_id] for (pool_id, team_ids), count in groups], dtype=np.int64)
+        membership = weights > 0
+
+        counts = {
+            'min': np.full(len(self.pool_ids), np.iinfo(np.int64).max),
+            'max': np.zeros(len(self.pool_ids), dtype=np.int64),
+            'total': np.zeros(len(self.pool_ids), dtype=np.int64),
+            'wiped_out': np.zeros(len(self.pool_ids), dtype=np.int64),
+        }
+        shifts = np.arange(len(units))
+        outcomes = 2 ** len(units)
+        for start in range(0, outcomes, ENUMERATION_BATCH):
+            outcome_ids = np.arange(start, min(start + ENUMERATION_BATCH, outcomes))
+            bits = (outcome_ids[:, None] >> shifts & 1).astype(bool)
+
+            # Wins per group in every outcome of the batch (every picked team is decided in each outcome)
+            wins = np.zeros((len(outcome_ids), len(groups)), dtype=np.int64)
+            for i, ((pool_id, team_ids), count) in enumerate(groups):
+                for team_id in team_ids:
+                    if team_id in team_bits:
+                        bit, wins_when_set = team_bits[team_id]
+                        wins[:, i] += bits[:, bit] if wins_when_set else ~bits[:, bit]
+                    else:
+                        wins[:, i] += self.known_results[team_id] == 'win'
+
+            # rules.week_statuses for fully decided results: single-pick groups need every pick to win;
+            # double-pick groups need two wins, or one win when nobody in the pool has two
+            survives = wins == pick_counts
+            two_wins_in_pool = ((wins >= 2) & is_double).astype(np.int64) @ membership > 0
+            survives[:, is_double] = (wins >= 2)[:, is_double] | (
+                (wins == 1) & ~two_wins_in_pool[:, group_pools]
+            )[:, is_double]
+            survives[:, no_picks] = not self.past_deadline
+
+            survivors = survives.astype(np.int64) @ weights
+            counts['min'] = np.minimum(counts['min'], survivors.min(axis=0))
+            counts['max'] = np.maximum(counts['max'], survivors.max(axis=0))
+            counts['total'] += survivors.sum(axis=0)
+            counts['wiped_out'] += (survivors == 0).sum(axis=0)
+
+        return {
+            pool_id: {name: int(values[i]) for name, values in counts.items()}
+            for pool_id, i in pool_index.items()
+        }
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# How long one process may hold the rebuild lock for a key before others give up on it
+LOCK_TIMEOUT = 30
+
+# How long an expired value is still served while a single refresh replaces it
+STALE_TIMEOUT = 300
+
+# How often waiters check whether the value has been built
+WAIT_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def single_flight(key, build, timeout):
+    """
+    Get a cached value, making sure only one request at a time rebuilds it.
+
+    The first request to find the key missing takes a short lock in the cache
+    (cache.add, so it works across processes with a shared cache) and builds
+    the value; concurrent requests for the same key wait for it instead of
+    running the same queries. Once a value is older than timeout it is still
+    served for STALE_TIMEOUT more seconds while one background thread
+    refreshes it.
+
+    If the lock holder doesn't finish within LOCK_TIMEOUT the waiter builds
+    the value itself, so a crashed worker can't block a page.
+    """
+    cached = cache.get(key)
+    if cached is not None:
+        if cached['fresh_until'] < time.time() and cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+            threading.Thread(target=_refresh_in_background, args=(key, build, timeout), daemon=True).start()
+        return cached['value']
+
+    if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        try:
+            return _build_and_store(key, build, timeout)
+        finally:
+            cache.delete(_lock_key(key))
+
+    # Someone else is building it - wait for their result
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached['value']
+        if cache.get(_lock_key(key)) is None:
+            # The builder gave up without storing anything
+            break
+
+    return _build_and_store(key, build, timeout)
+
+
+def _build_and_store(key, build, timeout):
+    value = build()
+    cache.set(key, {'value': value, 'fresh_until': time.time() + timeout}, timeout + STALE_TIMEOUT)
+    return value
+
+
+def _refresh_in_background(key, build, timeout):
+    """Replace a stale value, then release the lock and this thread's database connections"""
+    try:
+        _build_and_store(key, build, timeout)
+    except Exception as e:
+        logger.error(f"Error refreshing {key}: {e}")
+    finally:
+        cache.delete(_lock_key(key))
+        connections.close_all()
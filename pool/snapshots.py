@@ -0,0 +1,93 @@
+from collections import namedtuple
+
+from .models import Pool, Entry, Pick, PickSnapshot, Team
+
+
+RESULT_LABELS = dict(Pick._meta.get_field('result').choices)
+
+BoardEntry = namedtuple('BoardEntry', ['id', 'entry_name'])
+
+
+class BoardPick:
+    """A pick read from a snapshot, with the attributes the templates use on Pick"""
+    __slots__ = ('entry', 'team', 'result')
+
+    def __init__(self, entry, team, result):
+        self.entry = entry
+        self.team = team
+        self.result = result
+
+    def get_result_display(self):
+        return RESULT_LABELS.get(self.result, self.result)
+
+
+class WeekBoard:
+    """
+    Every pick in a pool for a week whose deadline has passed, decoded from
+    its PickSnapshot.
+    """
+    def __init__(self, week, payload, teams_by_id, entries_by_id):
+        self.week = week
+        self.is_double = payload['double']
+        # Entries deleted since the snapshot was taken are skipped
+        self.picks = [
+            BoardPick(entries_by_id[entry_id], teams_by_id[team_id], result)
+            for entry_id, team_id, result in payload['picks']
+            if entry_id in entries_by_id
+        ]
+
+    def picks_by_entry(self):
+        """Map of entry id -> list of that entry's picks"""
+        by_entry = {}
+        for pick in self.picks:
+            by_entry.setdefault(pick.entry.id, []).append(pick)
+        return by_entry
+
+    def entries_with_picks(self):
+        return len({pick.entry.id for pick in self.picks})
+
+    def team_counts(self):
+        """
+        [{'team': Team, 'count': n, 'entries': [names]}] sorted by most picked.
+        An entry can't pick the same team twice in a week, so on double-pick
+        weeks both of an entry's picks are counted.
+        """
+        counts = {}
+        for pick in self.picks:
+            item = counts.setdefault(pick.team.id, {'team': pick.team, 'count': 0, 'entries': []})
+            item['count'] += 1
+            item['entries'].append(pick.entry.entry_name)
+        return sorted(counts.values(), key=lambda item: (-item['count'], item['team'].city))
+
+
+def load_board_lookups(pool_id):
+    """The team and entry lookups a board needs: two small queries, no join over Pick"""
+    teams_by_id = Team.objects.in_bulk()
+    entries_by_id = {
+        entry_id: BoardEntry(entry_id, entry_name)
+        for entry_id, entry_name in Entry.objects.filter(pool_id=pool_id).values_list('id', 'entry_name')
+    }
+    return teams_by_id, entries_by_id
+
+
+def get_week_board(pool_id, week, lookups=None):
+    """
+    The pick board for a pool and week, served from its snapshot.
+    Returns None if the week's deadline hasn't passed yet.
+    Pass lookups from load_board_lookups to share them across several weeks.
+    """
+    snapshot = PickSnapshot.for_week(pool_id, week)
+    if snapshot is None:
+        return None
+    teams_by_id, entries_by_id = lookups or load_board_lookups(pool_id)
+    return WeekBoard(week, snapshot.load(), teams_by_id, entries_by_id)
+
+
+def capture_week_snapshots(week):
+    """Take the snapshot for every active pool once a week's deadline has passed"""
+    if not week.is_past_deadline():
+        return 0
+    pool_ids = list(Pool.objects.filter(weeks=week, is_active=True).values_list('id', flat=True))
+    for pool_id in pool_ids:
+        PickSnapshot.capture(pool_id, week)
+    return len(pool_ids)
@@ -2,13 +2,49 @@ import logging
 from django.conf import settings
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
+from django.utils.html import strip_tags
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db.models import Count
-from .models import Pool, Week, Pick, Team
+from .models import Pool, Week, Team
+from .pages import get_week_picks_payload
 
 logger = logging.getLogger(__name__)
 
+def send_pick_confirmation_email(pick, is_double_pick=False):
+    """
+    Send the pick confirmation email for a newly created pick.
+    Called from the Pick post_save signal, and directly for picks saved with bulk_create.
+    """
+    # Prepare the email content
+    context = {
+        'user': pick.entry.user,
+        'entry': pick.entry,
+        'pick': pick,
+        'week': pick.week,
+        'team': pick.team,
+        'is_double_pick': is_double_pick,
+    }
+    
+    # Render the HTML email template
+    html_message = render_to_string('pool/email/pick_confirmation.html', context)
+    plain_message = strip_tags(html_message)
+    
+    # Send the email
+    try:
+        send_mail(
+            subject=f'LMS 2025: Week {pick.week.number} Pick Confirmation',
+            message=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[pick.entry.user.email],
+            html_message=html_message,
+            fail_silently=False,
+        )
+    except Exception as e:
+        # Log the error but don't crash the app
+        print(f"Error sending confirmation email: {e}")
+
+
 def send_picks_report_email(pool_id, week_id):
     """
     Send a report email to all pool participants when the week's deadline passes.
@@ -21,35 +57,25 @@ def send_picks_report_email(pool_id, week_id):
             # Deadline hasn't passed yet, don't send report
             return
         
-        # Get all picks for this week and pool
-        picks = Pick.objects.filter(entry__pool=pool, week=week)
-        
-        # Group picks by team
-        team_counts = {}
-        for pick in picks:
-            team_id = pick.team.id
-            if team_id not in team_counts:
-                team_counts[team_id] = {
-                    'team': pick.team,
-                    'entries': [],
-                    'count': 0
-                }
-            team_counts[team_id]['entries'].append(pick.entry.entry_name)
-            team_counts[team_id]['count'] += 1
+        # The same cached payload week_picks uses, so the report and the page
+        # rush after a deadline share one build
+        payload = get_week_picks_payload(pool, week)
+        picks_by_entry = {}
+        for pick in payload['picks']:
+            picks_by_entry.setdefault(pick.entry.id, []).append(pick)
         
-        # Sort by count descending
-        team_distribution = [team_counts[team_id] for team_id in team_counts]
-        team_distribution.sort(key=lambda x: x['count'], reverse=True)
+        # Group picks by team, sorted by count descending
+        team_distribution = payload['teams_with_counts']
         
         # Get all participants' emails
         users = get_user_model().objects.filter(
-            entry__pool=pool
+            entries__pool=pool
         ).distinct()
         
         for user in users:
             # Get user's entries and their picks
-            user_entries = user.entry_set.filter(pool=pool)
-            user_picks = picks.filter(entry__in=user_entries)
+            user_entries = list(user.entries.filter(pool=pool))
+            user_picks = [pick for entry in user_entries for pick in picks_by_entry.get(entry.id, [])]
             
             # Build email context
             context = {
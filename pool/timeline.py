@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CacheVersion, Pick, PoolWeekSettings
+
+
+def _version_key(entry_id):
+    return f"entry-timeline-version:{entry_id}"
+
+
+def entry_timeline_version(entry_id):
+    """The entry's cache version; it changes whenever the entry or its picks do"""
+    return CacheVersion.current(_version_key(entry_id))[0]
+
+
+def get_entry_timeline(entry, week, is_owner):
+    """
+    The pick history, current-week picks and available teams for entry_detail.
+
+    Cached in two copies per entry: one for the owner and one public copy
+    shared by every other viewer, which has the privacy rules already
+    applied. Both are keyed by the current week and whether its deadline has
+    passed, so picks are revealed as soon as the deadline goes by.
+    """
+    past_deadline = week.is_past_deadline() if week else False
+    version = entry_timeline_version(entry.id)
+    key = (
+        f"entry-timeline:{entry.id}:{version}:{'owner' if is_owner else 'public'}:"
+        f"{week.id if week else 0}:{int(past_deadline)}"
+    )
+
+    timeline = cache.get(key)
+    if timeline is None:
+        timeline = build_entry_timeline(entry, week, is_owner, past_deadline)
+        cache.set(key, timeline, settings.ENTRY_TIMELINE_CACHE_TIMEOUT)
+    return timeline
+
+
+def build_entry_timeline(entry, week, is_owner, past_deadline):
+    """Build the timeline from one Pick query (with team and week joined in)"""
+    from .forms import TeamOptions  # forms imports pool.picks, which imports this module
+
+    picks = list(
+        Pick.objects.filter(entry=entry).select_related('team', 'week').order_by('week__number', 'id')
+    )
+    current_week_picks = [pick for pick in picks if week and pick.week_id == week.id]
+
+    # Available teams come from the picks already loaded, not another subquery
+    used_team_ids = {pick.team_id for pick in picks if pick.uses_up_team(week, past_deadline)}
+    available_teams = TeamOptions().teams_for(week, used_team_ids)
+
+    is_double_pick = False
+    if week:
+        is_double_pick = PoolWeekSettings.objects.filter(
+            pool_id=entry.pool_id, week=week, is_double=True
+        ).exists()
+
+    # Apply privacy controls for non-owners
+    if not is_owner and week:
+        # For current week's picks, only show if past deadline
+        if not past_deadline:
+            current_week_picks = None
+
+        # Only show picks from past weeks to non-owners
+        picks = [pick for pick in picks if pick.week.number < week.number]
+
+    return {
+        'picks': picks,
+        'current_week_picks': current_week_picks,
+        'has_current_pick': bool(current_week_picks),
+        'available_teams': available_teams,
+        'is_double_pick': is_double_pick,
+    }
+
+
+def invalidate_entry_timeline(*entry_ids):
+    """Retire every cached timeline for these entries by bumping their version"""
+    CacheVersion.bump([_version_key(entry_id) for entry_id in entry_ids])
@@ -14,5 +14,7 @@ urlpatterns = [
     path('entry/<int:entry_id>/pick/', views.make_pick, name='make_pick'),
     path('pool/<int:pool_id>/quick-pick/', views.quick_pick, name='quick_pick'),
     path('pool/<int:pool_id>/standings/', views.standings, name='standings'),
+    path('pool/<int:pool_id>/standings/<str:tab>/', views.standings_tab, name='standings_tab'),
+    path('pool/<int:pool_id>/events/', views.pool_events, name='pool_events'),
     path('pool/<int:pool_id>/week/<int:week_number>/', views.week_picks, name='week_picks'),
 ]
@@ -0,0 +1,151 @@
+from collections import defaultdict
+
+from django.conf import settings as django_settings
+from django.utils import timezone
+
+from . import rules
+from .db import serialized_write
+from .models import AuditLog, Entry, Pick, Pool, PoolWeekSettings, Week, WeeklyResult
+from .results import sync_pick_results, write_entry_statuses
+
+
+# Why the replay eliminates an entry
+MISSED_PICK = 'no pick by the deadline'
+LOST_PICK = 'pick results'
+
+# Audit actions that change an entry's status; the latest one being an admin's
+# means the admin overrode the rules, and the entry is reported but not fixed
+STATUS_ACTIONS = (
+    'ENTRY_ELIMINATED', 'ENTRY_REVIVED', 'ADMIN_PICK_CHANGE_ELIMINATED', 'ADMIN_PICK_CHANGE_REVIVED',
+    'Auto-Eliminated', 'ADMIN_MARKED_ALIVE', 'ADMIN_MARKED_ELIMINATED',
+)
+OVERRIDE_ACTIONS = ('ADMIN_MARKED_ALIVE', 'ADMIN_MARKED_ELIMINATED')
+
+
+def verify_pool_state(pool_ids=None, fix=False):
+    """
+    Replay the season for pools (every active pool by default) and compare
+    the outcome with each entry's is_alive and eliminated_in_week.
+
+    Every pick, result, week setting and status audit row is loaded up
+    front, so the check takes a fixed handful of queries however many
+    entries there are. Weeks run in order over each pool's weeks (every
+    week if it has no PoolWeekSettings): picks are judged by their team's
+    WeeklyResult through pool.rules, and an entry with no pick for a week
+    is out by pool.rules.missed_pick_weeks, the rule the app enforces while
+    each week runs.
+
+    Returns a dict with:
+    - 'entries': how many entries were checked
+    - 'wrong': (entry, expected week or None for alive, reason) for each
+      entry whose state differs from the replay
+    - 'overridden': the same, for entries an admin last marked alive or
+      eliminated by hand, which are left alone
+    - 'stale_picks': how many picks disagree with their team's WeeklyResult
+
+    With fix, the checked pools' picks are synced and their wrong entries
+    corrected in bulk, each with one audit row, all in one transaction.
+    """
+    with serialized_write():
+        if pool_ids is None:
+            pool_ids = list(Pool.objects.filter(is_active=True).values_list('id', flat=True))
+        report = _replay(pool_ids)
+        if fix:
+            if report['stale_picks']:
+                sync_pick_results(list(Week.objects.order_by('number')), pool_ids=pool_ids)
+            write_entry_statuses([
+                (entry, week, _action(week, reason), _details(entry, week, reason))
+                for entry, week, reason in report['wrong']
+            ])
+    return report
+
+
+def _replay(pool_ids):
+    now = timezone.now()
+    pools = Pool.objects.filter(pk__in=pool_ids)
+    weeks = list(Week.objects.order_by('number'))
+
+    entries = Entry.objects.filter(pool__in=pools).select_related('pool', 'eliminated_in_week').in_bulk()
+    week_results = {
+        (week_id, team_id): result
+        for week_id, team_id, result in WeeklyResult.objects.values_list('week_id', 'team_id', 'result')
+    }
+
+    picks = defaultdict(list)  # (entry id, week id) -> teams, in pick order
+    stale_picks = 0
+    for entry_id, week_id, team_id, result in (
+        Pick.objects.filter(entry__pool__in=pools).order_by('id').values_list('entry_id', 'week_id', 'team_id', 'result')
+    ):
+        picks[(entry_id, week_id)].append(team_id)
+        stale_picks += result != week_results.get((week_id, team_id), 'pending')
+
+    settings = defaultdict(dict)  # pool id -> {week id: is_double}
+    for pool_id, week_id, is_double in (
+        PoolWeekSettings.objects.filter(pool__in=pools).values_list('pool_id', 'week_id', 'is_double')
+    ):
+        settings[pool_id][week_id] = is_double
+
+    latest_actions = {}
+    for entry_id, action in (
+        AuditLog.objects.filter(entry__pool__in=pools, action__in=STATUS_ACTIONS)
+        .order_by('timestamp', 'id')
+        .values_list('entry_id', 'action')
+    ):
+        latest_actions[entry_id] = action
+
+    entries_by_pool = defaultdict(list)
+    for entry_id, entry in sorted(entries.items()):
+        entries_by_pool[entry.pool_id].append(entry_id)
+
+    # Each pool's season as compact arrays for pool.rules.replay_pools
+    pool_weeks = {}
+    payloads = []
+    for pool_id, entry_ids in entries_by_pool.items():
+        pool_weeks[pool_id] = [week for week in weeks if week.id in settings[pool_id]] or weeks
+        windows = [(week.deadline, week.end_date) for week in pool_weeks[pool_id]]
+        required = set(rules.missed_pick_weeks(windows, now))
+        payloads.append((
+            [(settings[pool_id].get(week.id, False), index in required) for index, week in enumerate(pool_weeks[pool_id])],
+            [
+                (
+                    tuple(
+                        ''.join(rules.RESULT_CODES[week_results.get((week.id, team_id), 'pending')] for team_id in picks.get((entry_id, week.id), ()))
+                        for week in pool_weeks[pool_id]
+                    ),
+                    # Weeks that ended before the entry existed can't be missed
+                    min(rules.missed_pick_weeks(windows, now, entries[entry_id].created_at), default=len(windows)),
+                )
+                for entry_id in entry_ids
+            ],
+        ))
+
+    expected = {}  # entry id -> (week, reason) for every entry the replay eliminates
+    outcomes = rules.replay_pools(payloads, workers=django_settings.SURVIVAL_WORKERS)
+    for (pool_id, entry_ids), pool_outcomes in zip(entries_by_pool.items(), outcomes):
+        for entry_id, outcome in zip(entry_ids, pool_outcomes):
+            if outcome is not None:
+                week_index, missed = outcome
+                expected[entry_id] = (pool_weeks[pool_id][week_index], MISSED_PICK if missed else LOST_PICK)
+
+    report = {'entries': len(entries), 'wrong': [], 'overridden': [], 'stale_picks': stale_picks}
+    for entry_id, entry in sorted(entries.items()):
+        week, reason = expected.get(entry_id, (None, None))
+        if week is None and entry.is_alive and entry.eliminated_in_week_id is None:
+            continue
+        if week is not None and not entry.is_alive and entry.eliminated_in_week_id == week.id:
+            continue
+        kind = 'overridden' if latest_actions.get(entry_id) in OVERRIDE_ACTIONS else 'wrong'
+        report[kind].append((entry, week, reason))
+    return report
+
+
+def _action(week, reason):
+    if week is None:
+        return 'ENTRY_REVIVED'
+    return 'Auto-Eliminated' if reason == MISSED_PICK else 'ENTRY_ELIMINATED'
+
+
+def _details(entry, week, reason):
+    if week is None:
+        return f"{entry.entry_name} was revived when pool state was verified"
+    return f"{entry.entry_name} was eliminated in Week {week.number} for {reason} when pool state was verified"
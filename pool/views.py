@@ -1,39 +1,42 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.urls import reverse
-from .models import Pool, Week, Team, Entry, Pick, PoolWeekSettings, WeeklyResult, AuditLog
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .models import Pool, Week, Entry, Pick, PoolWeekSettings, PoolSummary, WeeklyResult
 from .forms import PickForm, QuickPickForm, DoublePickForm
+from .picks import save_entry_picks
+from .dashboard import get_home_dashboard
+from .timeline import get_entry_timeline
+from .pages import STANDINGS_TABS, get_standings_tab, get_previous_week, get_week_picks_payload
+from .live import pool_event_stream
+from .conditional import standings_etag, week_picks_etag, entry_detail_etag
+from .decorators import async_login_required, async_revalidate
 
 
-@login_required
-def home(request):
+@async_login_required
+async def home(request):
     """
     Home page view showing the user's pools and entries.
     """
-    # Get all pools the user has entries in
-    user_pools = Pool.objects.filter(entries__user=request.user).distinct()
-    
-    # Get current week
-    current_week = Week.objects.filter(
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).first()
+    # Get current week (or the next upcoming week)
+    current_week = await Week.aget_current()
     
-    # If no current week, get the next upcoming week
-    if not current_week:
-        current_week = Week.objects.filter(
-            start_date__gt=timezone.now()
-        ).order_by('start_date').first()
+    # Per-pool counts for the user's entries, from one query and cached per user
+    user_pools = await sync_to_async(get_home_dashboard)(request.user, current_week)
     
     context = {
         'user_pools': user_pools,
         'current_week': current_week,
     }
     
-    return render(request, 'pool/home.html', context)
+    return await sync_to_async(render)(request, 'pool/home.html', context)
 
 
 @login_required
@@ -48,45 +51,32 @@ def pool_detail(request, pool_id):
     if eliminated_count > 0:
         messages.warning(request, f'{eliminated_count} entries were eliminated due to no picks by the deadline.')
     
-    # Get user's entries in this pool
-    user_entries = Entry.objects.filter(pool=pool, user=request.user)
+    # Get current week (or the next upcoming week)
+    current_week = Week.get_current()
     
-    # Get current week
-    current_week = Week.objects.filter(
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).first()
+    # Get the user's entries in this pool, alive entries first
+    user_entries = sorted(
+        Entry.objects.filter(pool=pool, user=request.user),
+        key=lambda entry: not entry.is_alive
+    )
     
-    # If no current week, get the next upcoming week
-    if not current_week:
-        current_week = Week.objects.filter(
-            start_date__gt=timezone.now()
-        ).order_by('start_date').first()
+    # Get the current week's pick(s) for all of the user's entries in one query
+    picks_by_entry = {entry.id: [] for entry in user_entries}
+    if current_week:
+        for pick in Pick.objects.filter(entry__in=user_entries, week=current_week).select_related('team'):
+            picks_by_entry[pick.entry_id].append(pick)
     
-    # Get all entries in this pool
-    all_entries = Entry.objects.filter(pool=pool)
-    alive_entries = all_entries.filter(is_alive=True)
-    eliminated_entries = all_entries.filter(is_alive=False)
-    
-    # Get the current picks for each of the user's entries
-    # Sort entries so alive entries appear first, then eliminated entries
-    alive_user_entries = user_entries.filter(is_alive=True)
-    eliminated_user_entries = user_entries.filter(is_alive=False)
-    
-    # Combine the lists with alive entries first
-    sorted_user_entries = list(alive_user_entries) + list(eliminated_user_entries)
-    
-    # Get picks for each entry in the sorted order
-    entries_with_picks = []
-    for entry in sorted_user_entries:
-        # Get the current week's pick(s) for this entry
-        picks = Pick.objects.filter(entry=entry, week=current_week).select_related('team')
-        entry_data = {
+    entries_with_picks = [
+        {
             'entry': entry,
-            'picks': picks,
-            'has_pick': picks.exists()
+            'picks': picks_by_entry[entry.id],
+            'has_pick': bool(picks_by_entry[entry.id])
         }
-        entries_with_picks.append(entry_data)
+        for entry in user_entries
+    ]
+    
+    # Entry counts come from the materialized summary row instead of COUNT queries
+    summary = PoolSummary.for_pool(pool.id, current_week)
     
     # Get the week settings to check if it's a double-pick week
     week_settings = None
@@ -97,16 +87,16 @@ def pool_detail(request, pool_id):
         'pool': pool,
         'entries_with_picks': entries_with_picks,
         'current_week': current_week,
-        'alive_entries': alive_entries,
-        'eliminated_entries': eliminated_entries,
+        'summary': summary,
         'is_double_pick': week_settings.is_double if week_settings else False,
     }
     
     return render(request, 'pool/pool_detail.html', context)
 
 
-@login_required
-def entry_detail(request, entry_id):
+@async_login_required
+@async_revalidate(entry_detail_etag)
+async def entry_detail(request, entry_id):
     """
     View showing details of a specific entry.
     Privacy controls applied for non-owners:
@@ -114,66 +104,30 @@ def entry_detail(request, entry_id):
     - Current week picks are hidden until deadline passes
     - Available teams are visible to anyone
     """
-    entry = get_object_or_404(Entry, id=entry_id)
+    try:
+        entry = await Entry.objects.select_related('user', 'eliminated_in_week').aget(id=entry_id)
+    except Entry.DoesNotExist:
+        raise Http404("Entry not found")
     
     # Determine if the user is the owner of this entry
-    is_owner = (entry.user == request.user)
-    
-    # Get all picks for this entry
-    picks = Pick.objects.filter(entry=entry).order_by('week__number')
-    
-    # Get current week
-    current_week = Week.objects.filter(
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).first()
-    
-    # If no current week, get the next upcoming week
-    if not current_week:
-        current_week = Week.objects.filter(
-            start_date__gt=timezone.now()
-        ).order_by('start_date').first()
+    user = await sync_to_async(lambda: request.user)()
+    is_owner = (entry.user_id == user.id)
     
-    # Check if user has made a pick for the current week
-    current_week_picks = picks.filter(week=current_week)
-    has_current_pick = current_week_picks.exists()
+    # Get current week (or the next upcoming week)
+    current_week = await Week.aget_current()
     
-    # Get available teams
-    available_teams = entry.get_available_teams(current_week)
-    
-    # Get pool-specific settings for current week
-    is_double_pick = False
-    if current_week:
-        week_settings = PoolWeekSettings.objects.filter(
-            pool=entry.pool,
-            week=current_week
-        ).first()
-        if week_settings:
-            is_double_pick = week_settings.is_double
-    
-    # Apply privacy controls for non-owners
-    if not is_owner:
-        # For current week's picks, only show if past deadline
-        if current_week and not current_week.is_past_deadline:
-            current_week_picks = None
-            has_current_pick = False  # Hide this information
-        
-        # Only show picks from past weeks to non-owners
-        if current_week:
-            picks = picks.filter(week__number__lt=current_week.number)
+    # Picks, current-week picks and available teams, with privacy controls already
+    # applied for non-owners (the public copy is shared by everyone but the owner)
+    timeline = await sync_to_async(get_entry_timeline)(entry, current_week, is_owner)
     
     context = {
         'entry': entry,
-        'picks': picks,
         'current_week': current_week,
-        'has_current_pick': has_current_pick,
-        'current_week_picks': current_week_picks,
-        'available_teams': available_teams,
-        'is_double_pick': is_double_pick,
         'is_owner': is_owner,  # Pass ownership status to template
+        **timeline,
     }
     
-    return render(request, 'pool/entry_detail.html', context)
+    return await sync_to_async(render)(request, 'pool/entry_detail.html', context)
 
 
 @login_required
@@ -227,40 +181,18 @@ def make_pick(request, entry_id):
     # Check if this is a double-pick week
     if week_settings.is_double:
         # Get existing picks for this week
-        existing_picks = Pick.objects.filter(entry=entry, week=current_week)
+        existing_picks = list(Pick.objects.filter(entry=entry, week=current_week).select_related('team').order_by('id'))
         
         if request.method == 'POST':
             form = DoublePickForm(request.POST, entry=entry, week=current_week)
             
             if form.is_valid():
-                # Get the selected teams from the form
-                team1 = form.cleaned_data['team1']
-                team2 = form.cleaned_data['team2']
-                
-                # Store old teams for audit logging
-                old_team1 = None
-                old_team2 = None
-                if existing_picks.count() >= 2:
-                    old_team1 = existing_picks[0].team
-                    old_team2 = existing_picks[1].team
-                
-                # Delete existing picks for this week
-                existing_picks.delete()
-                
-                # Save new picks
-                picks = form.save()
-                
-                # Create audit log entries
-                if old_team1 and old_team2:
-                    # Log a change of picks
-                    action = "DOUBLE_PICK_CHANGED"
-                    details = f"{entry.entry_name} changed picks for Week {current_week.number} from {old_team1}/{old_team2} to {team1}/{team2}"
-                    AuditLog.create(request.user, action, entry, current_week, details)
-                else:
-                    # Log new picks
-                    action = "DOUBLE_PICK_CREATED"
-                    details = f"{entry.entry_name} picked {team1} and {team2} for Week {current_week.number}"
-                    AuditLog.create(request.user, action, entry, current_week, details)
+                try:
+                    # Update the picks in place; the audit entry is written in the same transaction
+                    form.save(user=request.user)
+                except ValidationError as e:
+                    messages.error(request, str(e))
+                    return redirect('entry_detail', entry_id=entry.id)
                 
                 messages.success(request, f"Your picks for Week {current_week.number} have been saved.")
                 # Redirect to pool detail page for consistency with single-pick weeks
@@ -268,7 +200,7 @@ def make_pick(request, entry_id):
         else:
             # If there are existing picks, pre-populate the form
             initial_data = {}
-            if existing_picks.count() >= 2:
+            if len(existing_picks) >= 2:
                 initial_data = {
                     'team1': existing_picks[0].team,
                     'team2': existing_picks[1].team,
@@ -278,10 +210,7 @@ def make_pick(request, entry_id):
     else:
         # Regular single-pick week
         # Try to get existing pick
-        try:
-            existing_pick = Pick.objects.get(entry=entry, week=current_week)
-        except Pick.DoesNotExist:
-            existing_pick = None
+        existing_pick = Pick.objects.filter(entry=entry, week=current_week).select_related('team').first()
         
         if request.method == 'POST':
             # Handle the form submission
@@ -297,37 +226,14 @@ def make_pick(request, entry_id):
                     # Get the team from the cleaned data
                     team = form.cleaned_data['team']
                     
-                    # Check for existing pick to determine if this is a new pick or a change
-                    existing_pick = Pick.objects.filter(entry=entry, week=current_week).first()
-                    
-                    # Store the old team for the audit log if this is a change
-                    old_team = None
-                    if existing_pick:
-                        old_team = existing_pick.team
-                    
-                    # Delete any existing picks for this entry and week to avoid duplicates
-                    Pick.objects.filter(entry=entry, week=current_week).delete()
-                    
-                    # Create a new pick directly instead of using form.save
-                    # This ensures all fields are properly set
-                    pick = Pick(
-                        entry=entry,  # Explicitly set the entry
-                        week=current_week,
-                        team=team
+                    # Update the existing pick in place (or create it) under a lock on the entry
+                    save_entry_picks(
+                        entry,
+                        current_week,
+                        [team],
+                        user=request.user,
+                        submission_key=form.cleaned_data.get('submission_key', ''),
                     )
-                    pick.save()
-                    
-                    # Create audit log entry
-                    if old_team:
-                        # Log a pick change
-                        action = "PICK_CHANGED"
-                        details = f"{entry.entry_name} changed pick for Week {current_week.number} from {old_team} to {team}"
-                        AuditLog.create(request.user, action, entry, current_week, details)
-                    else:
-                        # Log a new pick
-                        action = "PICK_CREATED"
-                        details = f"{entry.entry_name} picked {team} for Week {current_week.number}"
-                        AuditLog.create(request.user, action, entry, current_week, details)
                     
                     messages.success(request, f'Successfully saved your pick of {team} for Week {current_week.number}')
                     return redirect('pool_detail', pool_id=entry.pool.id)
@@ -365,10 +271,10 @@ def quick_pick(request, pool_id):
     """
     pool = get_object_or_404(Pool, id=pool_id)
     
-    # Get user's entries in this pool
-    user_entries = Entry.objects.filter(pool=pool, user=request.user, is_alive=True)
+    # Get user's entries in this pool (evaluated once; the form and template reuse the list)
+    user_entries = list(Entry.objects.filter(pool=pool, user=request.user, is_alive=True).select_related('user'))
     
-    if not user_entries.exists():
+    if not user_entries:
         messages.error(request, "You don't have any active entries in this pool.")
         return redirect('pool_detail', pool_id=pool.id)
     
@@ -403,85 +309,22 @@ def quick_pick(request, pool_id):
         )
         
         if form.is_valid():
-            # Store existing picks for audit logging
-            existing_picks_map = {}
-            for entry in user_entries:
-                entry_picks = list(Pick.objects.filter(entry=entry, week=current_week))
-                existing_picks_map[entry.id] = entry_picks
-            
-            # Delete existing picks for this week
-            for entry in user_entries:
-                Pick.objects.filter(entry=entry, week=current_week).delete()
-            
-            # Save new picks
-            picks = form.save()
-            
-            # Create audit log entries for each entry
-            for entry in user_entries:
-                if is_double_pick:
-                    team1_field = f'entry_{entry.id}_team1'
-                    team2_field = f'entry_{entry.id}_team2'
-                    
-                    if team1_field in form.cleaned_data and team2_field in form.cleaned_data:
-                        team1 = form.cleaned_data[team1_field]
-                        team2 = form.cleaned_data[team2_field]
-                        
-                        # Get old teams for comparison
-                        old_teams = [p.team for p in existing_picks_map.get(entry.id, [])]
-                        old_teams_str = ", ".join([t.name for t in old_teams]) if old_teams else "None"
-                        
-                        # Create audit entry
-                        if old_teams:
-                            action = "Changed Pick"
-                            details = f"Changed from {old_teams_str} to {team1.name}, {team2.name} via Quick Pick"
-                        else:
-                            action = "Made Pick"
-                            details = f"Selected {team1.name}, {team2.name} via Quick Pick"
-                        
-                        AuditLog.create(request.user, action, entry, current_week, details)
-                else:
-                    team_field = f'entry_{entry.id}_team'
-                    
-                    if team_field in form.cleaned_data:
-                        team = form.cleaned_data[team_field]
-                        
-                        # Get old team for comparison
-                        old_teams = [p.team for p in existing_picks_map.get(entry.id, [])]
-                        old_team_str = old_teams[0].name if old_teams else "None"
-                        
-                        # Create audit entry
-                        if old_teams:
-                            action = "Changed Pick"
-                            details = f"Changed from {old_team_str} to {team.name} via Quick Pick"
-                        else:
-                            action = "Made Pick"
-                            details = f"Selected {team.name} via Quick Pick"
-                        
-                        AuditLog.create(request.user, action, entry, current_week, details)
+            # Only entries whose picks changed are written and audited
+            try:
+                form.save(user=request.user)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect('pool_detail', pool_id=pool.id)
             
             messages.success(request, f"Your picks for Week {current_week.number} have been saved.")
             return redirect('pool_detail', pool_id=pool.id)
     else:
-        # Pre-populate form with existing picks
-        initial_data = {}
-        
-        for entry in user_entries:
-            existing_picks = Pick.objects.filter(entry=entry, week=current_week)
-            
-            if is_double_pick:
-                if existing_picks.count() >= 2:
-                    initial_data[f'entry_{entry.id}_team1'] = existing_picks[0].team
-                    initial_data[f'entry_{entry.id}_team2'] = existing_picks[1].team
-            else:
-                if existing_picks.exists():
-                    initial_data[f'entry_{entry.id}_team'] = existing_picks.first().team
-        
+        # The form pre-populates itself from the entries' existing picks
         form = QuickPickForm(
             user=request.user,
             week=current_week,
             entries=user_entries,
-            is_double_pick=is_double_pick,
-            initial=initial_data
+            is_double_pick=is_double_pick
         )
     
     context = {
@@ -495,235 +338,144 @@ def quick_pick(request, pool_id):
     return render(request, 'pool/quick_pick.html', context)
 
 
-@login_required
-def standings(request, pool_id):
+@async_login_required
+@async_revalidate(standings_etag)
+async def standings(request, pool_id):
     """
     View showing standings for a specific pool.
     """
-    pool = get_object_or_404(Pool, id=pool_id)
+    try:
+        pool = await Pool.objects.aget(id=pool_id)
+    except Pool.DoesNotExist:
+        raise Http404("Pool not found")
     
     # Process automatic eliminations for entries without picks after deadline
-    eliminated_count = pool.process_missing_picks_eliminations()
+    eliminated_count = await sync_to_async(pool.process_missing_picks_eliminations)()
     if eliminated_count > 0:
-        messages.warning(request, f'{eliminated_count} entries were eliminated due to no picks by the deadline.')
+        await sync_to_async(messages.warning)(request, f'{eliminated_count} entries were eliminated due to no picks by the deadline.')
     
-    # Get all entries in this pool
-    alive_entries = Entry.objects.filter(pool=pool, is_alive=True)
-    
-    # Apply sorting to eliminated entries if requested
-    sort = request.GET.get('sort')
-    order = request.GET.get('order')
-    
-    eliminated_entries = Entry.objects.filter(pool=pool, is_alive=False)
-    
-    if sort == 'entry_name':
-        # Sort by entry name
-        if order == 'desc':
-            eliminated_entries = eliminated_entries.order_by('-entry_name')
-        else:
-            eliminated_entries = eliminated_entries.order_by('entry_name')
-    elif sort == 'eliminated_week':
-        # Sort by elimination week
-        if order == 'desc':
-            eliminated_entries = eliminated_entries.order_by('-eliminated_in_week__number')
-        else:
-            eliminated_entries = eliminated_entries.order_by('eliminated_in_week__number')
+    # Get current week (or the next upcoming week)
+    current_week = await Week.aget_current()
+    previous_week = None
+    if current_week and current_week.number > 1:
+        previous_week = await Week.objects.filter(number=current_week.number - 1).afirst()
     
-    # Get current week
-    current_week = Week.objects.filter(
-        start_date__lte=timezone.now(),
-        end_date__gte=timezone.now()
-    ).first()
+    # Only the visible tab is built here; the others load as fragments when clicked
+    current_tab = _standings_tab(request, current_week, previous_week)
     
-    # If no current week, get the next upcoming week
-    if not current_week:
-        current_week = Week.objects.filter(
-            start_date__gt=timezone.now()
-        ).order_by('start_date').first()
+    # Tab counts come from the materialized summary row
+    summary = await sync_to_async(PoolSummary.for_pool)(pool.id, current_week)
     
-    # Get picks for the current week and previous week
     current_week_picks = None
-    teams_with_counts = None
-    previous_week = None
-    previous_week_picks = None
-    previous_teams_with_counts = None
-    user_entries_ids = []
+    if current_week and not current_week.is_past_deadline():
+        # If deadline has not passed, only show user's picks
+        # Don't show team distribution before deadline
+        user = await sync_to_async(lambda: request.user)()
+        current_week_picks = [
+            pick async for pick in Pick.objects.filter(
+                week=current_week, entry__pool=pool, entry__user=user
+            ).select_related('entry', 'team')
+        ]
     
-    # Get the user's entries IDs for this pool
-    if request.user.is_authenticated:
-        user_entries_ids = Entry.objects.filter(pool=pool, user=request.user).values_list('id', flat=True)
+    context = {
+        'pool': pool,
+        'summary': summary,
+        'current_week': current_week,
+        'current_week_picks': current_week_picks,
+        'previous_week': previous_week,
+        'current_tab': current_tab,
+        'live_events': settings.LIVE_EVENTS,
+        **await sync_to_async(_standings_tab_context)(request, pool, current_week, current_tab),
+    }
     
-    if current_week:
-        # Try to get the previous week
-        if current_week.number > 1:
-            previous_week = Week.objects.filter(number=current_week.number-1).first()
-        
-        if current_week.is_past_deadline():
-            # If deadline has passed, show all picks for current week
-            current_week_picks = Pick.objects.filter(week=current_week, entry__pool=pool)
-            
-            # Check if this is a double-pick week
-            week_settings = PoolWeekSettings.objects.filter(pool=pool, week=current_week).first()
-            is_double_pick = week_settings.is_double if week_settings else False
-            
-            if is_double_pick:
-                # For double-pick weeks, count all picks (don't use distinct)
-                # This ensures that when an entry is eliminated with two different picks,
-                # both appear in the distribution
-                team_counts = current_week_picks.values('team').annotate(
-                    count=Count('entry')
-                ).order_by('-count')
-            else:
-                # For regular weeks, count distinct entries
-                team_counts = current_week_picks.values('team').annotate(
-                    count=Count('entry', distinct=True)
-                ).order_by('-count')
-            
-            # Get team objects for the counts
-            teams_with_counts = []
-            for item in team_counts:
-                team = Team.objects.get(id=item['team'])
-                teams_with_counts.append({
-                    'team': team,
-                    'count': item['count']
-                })
-                
-            # Get only alive entries or entries that were eliminated in the current week
-            # (they should have made a pick but didn't)
-            eligible_entries = Entry.objects.filter(pool=pool).filter(Q(is_alive=True) | Q(eliminated_in_week=current_week)).count()
-            
-            # Get number of entries that made picks for this week
-            entries_with_picks = Pick.objects.filter(week=current_week, entry__pool=pool).values('entry').distinct().count()
-            
-            # Calculate eligible entries with no picks
-            no_pick_count = eligible_entries - entries_with_picks
-            
-            # Add No Pick to the distribution if there are entries without picks
-            if no_pick_count > 0:
-                teams_with_counts.append({
-                    'team': None,  # No team selected
-                    'count': no_pick_count,
-                    'is_no_pick': True  # Flag to identify this as No Pick in template
-                })
-            
-            # Process previous week data if available
-            if previous_week:
-                # Get previous week picks
-                previous_week_picks = Pick.objects.filter(week=previous_week, entry__pool=pool)
-                
-                # Check if previous week was a double-pick week
-                prev_week_settings = PoolWeekSettings.objects.filter(pool=pool, week=previous_week).first()
-                prev_is_double_pick = prev_week_settings.is_double if prev_week_settings else False
-                
-                if prev_is_double_pick:
-                    # For double-pick weeks, count all picks (don't use distinct)
-                    # This ensures that when an entry is eliminated with two different picks,
-                    # both appear in the distribution
-                    prev_team_counts = previous_week_picks.values('team').annotate(
-                        count=Count('entry')
-                    ).order_by('-count')
-                else:
-                    # For regular weeks, count distinct entries
-                    prev_team_counts = previous_week_picks.values('team').annotate(
-                        count=Count('entry', distinct=True)
-                    ).order_by('-count')
-                
-                # Get team objects for the counts
-                previous_teams_with_counts = []
-                for item in prev_team_counts:
-                    team = Team.objects.get(id=item['team'])
-                    previous_teams_with_counts.append({
-                        'team': team,
-                        'count': item['count']
-                    })
-                
-                # Calculate no picks for previous week - only include entries that were alive at that time
-                # We need to look at entries that were alive during that specific week:
-                # 1. Entries still alive now
-                # 2. Entries eliminated specifically in that week (meaning they were alive but didn't pick)
-                # 3. We should NOT include entries eliminated in later weeks (they would have had picks in this week)
-                prev_eligible_entries = Entry.objects.filter(pool=pool).filter(
-                    Q(is_alive=True) | 
-                    Q(eliminated_in_week=previous_week)
-                ).count()
-                
-                prev_entries_with_picks = Pick.objects.filter(week=previous_week, entry__pool=pool).values('entry').distinct().count()
-                prev_no_pick_count = prev_eligible_entries - prev_entries_with_picks
-                
-                if prev_no_pick_count > 0:
-                    previous_teams_with_counts.append({
-                        'team': None,
-                        'count': prev_no_pick_count,
-                        'is_no_pick': True
-                    })
-        else:
-            # If deadline has not passed, only show user's picks
-            if user_entries_ids:
-                current_week_picks = Pick.objects.filter(week=current_week, entry__id__in=user_entries_ids)
-                # Don't show team distribution before deadline
-                
-            # But still show previous week distribution if available
-            if previous_week and previous_week.is_past_deadline():
-                # Get previous week picks
-                previous_week_picks = Pick.objects.filter(week=previous_week, entry__pool=pool)
-                
-                # Check if previous week was a double-pick week
-                prev_week_settings = PoolWeekSettings.objects.filter(pool=pool, week=previous_week).first()
-                prev_is_double_pick = prev_week_settings.is_double if prev_week_settings else False
-                
-                if prev_is_double_pick:
-                    # For double-pick weeks, count all picks (don't use distinct)
-                    # This ensures that when an entry is eliminated with two different picks,
-                    # both appear in the distribution
-                    prev_team_counts = previous_week_picks.values('team').annotate(
-                        count=Count('entry')
-                    ).order_by('-count')
-                else:
-                    # For regular weeks, count distinct entries
-                    prev_team_counts = previous_week_picks.values('team').annotate(
-                        count=Count('entry', distinct=True)
-                    ).order_by('-count')
-                
-                # Get team objects for the counts
-                previous_teams_with_counts = []
-                for item in prev_team_counts:
-                    team = Team.objects.get(id=item['team'])
-                    previous_teams_with_counts.append({
-                        'team': team,
-                        'count': item['count']
-                    })
-                
-                # Calculate no picks for previous week - only include entries that were alive during that week
-                # We need to be consistent with the same logic used when deadline has passed
-                prev_eligible_entries = Entry.objects.filter(pool=pool).filter(
-                    Q(is_alive=True) | 
-                    Q(eliminated_in_week=previous_week)
-                ).count()
-                
-                prev_entries_with_picks = Pick.objects.filter(week=previous_week, entry__pool=pool).values('entry').distinct().count()
-                prev_no_pick_count = prev_eligible_entries - prev_entries_with_picks
-                
-                if prev_no_pick_count > 0:
-                    previous_teams_with_counts.append({
-                        'team': None,
-                        'count': prev_no_pick_count,
-                        'is_no_pick': True
-                    })
+    return await sync_to_async(render)(request, 'pool/standings.html', context)
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=standings_etag)
+def standings_tab(request, pool_id, tab):
+    """
+    One standings tab as an HTML fragment, loaded when the tab is first opened.
+    """
+    if tab not in STANDINGS_TABS:
+        raise Http404("Unknown standings tab")
+    pool = get_object_or_404(Pool, id=pool_id)
+    current_week = Week.get_current()
+    previous_week = get_previous_week(current_week)
     
     context = {
         'pool': pool,
-        'alive_entries': alive_entries,
-        'eliminated_entries': eliminated_entries,
         'current_week': current_week,
-        'current_week_picks': current_week_picks,
-        'teams_with_counts': teams_with_counts,
         'previous_week': previous_week,
-        'previous_week_picks': previous_week_picks,
-        'previous_teams_with_counts': previous_teams_with_counts,
-        'current_tab': request.GET.get('tab', 'alive'),
+        **_standings_tab_context(request, pool, current_week, tab),
     }
     
-    return render(request, 'pool/standings.html', context)
+    return render(request, f'pool/partials/standings_{tab}.html', context)
+
+
+def _standings_tab(request, current_week, previous_week):
+    """The tab named in the query string, falling back to Alive if it isn't shown"""
+    tab = request.GET.get('tab', 'alive')
+    if tab not in STANDINGS_TABS:
+        return 'alive'
+    if (tab == 'current_distribution' and not current_week) or (tab == 'previous_distribution' and not previous_week):
+        return 'alive'
+    return tab
+
+
+def _standings_tab_context(request, pool, current_week, tab):
+    """The cached data for one standings tab, with the eliminated list sorted as requested"""
+    tab_data = get_standings_tab(pool, current_week, tab)
+    if tab != 'eliminated':
+        return tab_data
+    
+    # Apply sorting to eliminated entries if requested
+    sort = request.GET.get('sort')
+    order = request.GET.get('order')
+    
+    eliminated_entries = tab_data['eliminated_entries']
+    
+    if sort == 'entry_name':
+        # Sort by entry name
+        eliminated_entries = sorted(
+            eliminated_entries, key=lambda entry: entry.entry_name, reverse=order == 'desc'
+        )
+    elif sort == 'eliminated_week':
+        # Sort by elimination week
+        eliminated_entries = sorted(
+            eliminated_entries,
+            key=lambda entry: entry.eliminated_in_week.number if entry.eliminated_in_week else 0,
+            reverse=order == 'desc'
+        )
+    
+    return {**tab_data, 'eliminated_entries': eliminated_entries}
+
+
+async def pool_events(request, pool_id):
+    """
+    Server-sent events feed of eliminations in a pool, for the standings page.
+    Async so that under ASGI an open stream doesn't hold a worker thread.
+    """
+    if not settings.LIVE_EVENTS:
+        # A 204 tells EventSource to stop reconnecting; under WSGI a stream would tie up a worker
+        return HttpResponse(status=204)
+    
+    # login_required doesn't support async views in Django 4.2
+    is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+    if not is_authenticated:
+        return HttpResponseForbidden("Login required")
+    if not await Pool.objects.filter(id=pool_id).aexists():
+        raise Http404("Pool not found")
+    
+    response = StreamingHttpResponse(
+        pool_event_stream(pool_id, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 def rules(request):
@@ -733,46 +485,30 @@ def rules(request):
     return render(request, 'pool/rules.html')
 
 
-@login_required
-def week_picks(request, pool_id, week_number):
+@async_login_required
+@async_revalidate(week_picks_etag)
+async def week_picks(request, pool_id, week_number):
     """
     View showing all picks for a specific week in a pool.
     """
-    pool = get_object_or_404(Pool, id=pool_id)
-    week = get_object_or_404(Week, number=week_number)
+    try:
+        pool = await Pool.objects.aget(id=pool_id)
+        week = await Week.objects.aget(number=week_number)
+    except (Pool.DoesNotExist, Week.DoesNotExist):
+        raise Http404("Pool or week not found")
     
     # Check if deadline has passed
     if not week.is_past_deadline():
-        messages.error(request, f"Picks for Week {week.number} are not visible until after the deadline.")
+        await sync_to_async(messages.error)(request, f"Picks for Week {week.number} are not visible until after the deadline.")
         return redirect('pool_detail', pool_id=pool.id)
     
-    # Get all picks for this week in this pool
-    picks = Pick.objects.filter(week=week, entry__pool=pool)
-    
-    # Count how many entries picked each team
-    team_counts = picks.values('team').annotate(
-        count=Count('entry', distinct=True)
-    ).order_by('-count')
-    
-    # Get team objects for the counts
-    teams_with_counts = []
-    for item in team_counts:
-        team = Team.objects.get(id=item['team'])
-        teams_with_counts.append({
-            'team': team,
-            'count': item['count']
-        })
-    
-    # Check if this is a double pick week for this pool
-    week_settings = PoolWeekSettings.objects.filter(pool=pool, week=week).first()
-    is_double_pick = week_settings.is_double if week_settings else False
+    # Served from the cached payload, built from the week's deadline snapshot
+    payload = await sync_to_async(get_week_picks_payload)(pool, week)
     
     context = {
         'pool': pool,
         'week': week,
-        'picks': picks,
-        'teams_with_counts': teams_with_counts,
-        'is_double_pick': is_double_pick,
+        **payload,
     }
     
-    return render(request, 'pool/week_picks.html', context)
+    return await sync_to_async(render)(request, 'pool/week_picks.html', context)